@@ -9,7 +9,7 @@ import os
 # Adiciona o diretório pai ao path para importar módulos do backend
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
 
-from backend.database import SessionLocal, Acao, Carteira, criar_usuario
+from backend.database import SessionLocal, Acao, Carteira, criar_usuario, init_db
 from backend.analyzer import analyze_stock
 from backend.auth import obter_usuario_atual, autenticar_e_criar_token
 
@@ -19,6 +19,11 @@ app = FastAPI(
     version="1.0.0"
 )
 
+@app.on_event("startup")
+async def inicializar_banco():
+    """Cria as tabelas na inicialização"""
+    init_db()
+
 # Configuração de CORS
 app.add_middleware(
     CORSMiddleware,
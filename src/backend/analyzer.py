@@ -5,9 +5,12 @@ Usa múltiplos provedores de dados com fallback automático
 
 import pandas as pd
 import numpy as np
-from typing import Dict, List
+from typing import Dict, List, Optional
 import logging
-from .data_providers import data_manager, create_fallback_data
+from .data_providers import data_manager, async_data_manager, create_fallback_data, is_valid_history
+from .quota import PRIORITY_HIGH
+from .deadline import deadline_scope
+from .stale_cache import ATTR_STALE, ATTR_FETCHED_AT, history_age
 
 # Configurar logging
 logger = logging.getLogger(__name__)
@@ -29,12 +32,64 @@ def calculate_macd(data: pd.Series, fast: int = 12, slow: int = 26, signal: int
     signal_line = macd_line.ewm(span=signal).mean()
     return macd_line.iloc[-1] - signal_line.iloc[-1]
 
-def analyze_stock(stock_code: str) -> Dict:
+# Histórico ainda não obtido: analyze_stock faz a busca
+_FETCH = object()
+
+def fetch_stock_history(normalized_code: str, stock_info: Dict, priority: str = PRIORITY_HIGH) -> Optional[pd.DataFrame]:
+    """
+    Histórico de 30 dias da ação; para ações fracionárias, tenta primeiro o código
+    fracionário, depois o código base
+    """
+    hist = data_manager.get_historical_data(normalized_code, days=30, priority=priority)
+    if stock_info['is_fractional'] and not is_valid_history(hist):
+        base_code = stock_info['base_code']
+        logger.info(f"Dados não encontrados ou inválidos para {normalized_code}, tentando código base {base_code}")
+        hist = data_manager.get_historical_data(base_code, days=30, priority=priority)
+        if is_valid_history(hist):
+            logger.info(f"Dados válidos encontrados para código base {base_code}. Último preço: {hist['Close'].iloc[-1]}")
+    return hist
+
+async def afetch_stock_history(normalized_code: str, stock_info: Dict,
+                               priority: str = PRIORITY_HIGH) -> Optional[pd.DataFrame]:
+    """Versão assíncrona de fetch_stock_history (AsyncDataProviderManager, sem bloquear o event loop)"""
+    hist = await async_data_manager.get_historical_data(normalized_code, days=30, priority=priority)
+    if stock_info['is_fractional'] and not is_valid_history(hist):
+        base_code = stock_info['base_code']
+        logger.info(f"Dados não encontrados ou inválidos para {normalized_code}, tentando código base {base_code}")
+        hist = await async_data_manager.get_historical_data(base_code, days=30, priority=priority)
+        if is_valid_history(hist):
+            logger.info(f"Dados válidos encontrados para código base {base_code}. Último preço: {hist['Close'].iloc[-1]}")
+    return hist
+
+async def aanalyze_stock(stock_code: str, priority: str = PRIORITY_HIGH, deadline_s: float = None) -> Dict:
+    """
+    Versão assíncrona de analyze_stock para a API: a busca dos dados roda no event
+    loop; o cálculo dos indicadores é o mesmo de analyze_stock
+    """
+    from backend.utils import normalize_stock_code, validate_stock_code
+    
+    try:
+        normalized_code = normalize_stock_code(stock_code)
+        stock_info = validate_stock_code(stock_code)
+    except ValueError:
+        # Código inválido: analyze_stock monta a resposta de erro sem buscar dados
+        return analyze_stock(stock_code, priority)
+    
+    with deadline_scope(deadline_s):
+        hist = await afetch_stock_history(normalized_code, stock_info, priority)
+    return analyze_stock(stock_code, priority, history=hist)
+
+def analyze_stock(stock_code: str, priority: str = PRIORITY_HIGH, deadline_s: float = None,
+                  history: Optional[pd.DataFrame] = _FETCH) -> Dict:
     """
     Analisa uma ação usando indicadores técnicos com múltiplos provedores
     
     Args:
         stock_code: Código da ação (ex: PETR4.SA ou PETR4 ou PETR4F)
+        priority: Prioridade da busca de dados (PRIORITY_LOW pode poupar provedores com cota diária)
+        deadline_s: Prazo total em segundos para obter os dados (inclui a tentativa com o código base)
+        history: Histórico já obtido (ex: por aanalyze_stock; None se a busca falhou);
+            omitido, é buscado aqui
     
     Returns:
         Dict com análise completa incluindo recomendações
@@ -54,23 +109,14 @@ def analyze_stock(stock_code: str) -> Dict:
         logger.info(f"Iniciando análise de {stock_info['display_name']} (código normalizado: {normalized_code})")
         
         # Tenta obter dados históricos usando múltiplos provedores
-        # Para ações fracionárias, tenta primeiro o código fracionário, depois o código base
-        def is_valid_hist(hist):
-            return hist is not None and not hist.empty and 'Close' in hist.columns and hist['Close'].dropna().size >= 5 and hist['Close'].max() > 0
-
-        if stock_info['is_fractional']:
-            hist = data_manager.get_historical_data(normalized_code, days=30)
-            if not is_valid_hist(hist):
-                base_code = stock_info['base_code']
-                logger.info(f"Dados não encontrados ou inválidos para {normalized_code}, tentando código base {base_code}")
-                hist = data_manager.get_historical_data(base_code, days=30)
-                if is_valid_hist(hist):
-                    logger.info(f"Dados válidos encontrados para código base {base_code}. Último preço: {hist['Close'].iloc[-1]}")
+        if history is _FETCH:
+            with deadline_scope(deadline_s):
+                hist = fetch_stock_history(normalized_code, stock_info, priority)
         else:
-            hist = data_manager.get_historical_data(normalized_code, days=30)
+            hist = history
 
         # Se todos os provedores falharam, usa dados simulados
-        if not is_valid_hist(hist):
+        if not is_valid_history(hist):
             logger.warning(f"Todos os provedores falharam para {normalized_code}, usando dados simulados")
             hist = create_fallback_data(normalized_code)
             using_simulated_data = True
@@ -78,6 +124,10 @@ def analyze_stock(stock_code: str) -> Dict:
             using_simulated_data = False
             logger.info(f"Dados válidos encontrados para {normalized_code}. Último preço: {hist['Close'].iloc[-1]}")
         
+        # Procedência dos dados: histórico antigo servido quando os provedores falharam
+        using_stale_data = bool(hist.attrs.get(ATTR_STALE, False))
+        data_age = history_age(hist)
+        
         # Verifica se temos dados suficientes
         if len(hist) < 5:
             raise ValueError(f"Dados insuficientes para análise de {normalized_code}")
@@ -117,6 +167,8 @@ def analyze_stock(stock_code: str) -> Dict:
         
         if using_simulated_data:
             conditions.append("⚠️ Usando dados simulados (APIs indisponíveis)")
+        elif using_stale_data:
+            conditions.append(f"⏳ Usando último histórico disponível, de {data_age / 3600:.1f}h atrás (APIs indisponíveis)")
         else:
             conditions.append("✅ Dados obtidos de provedor externo")
             
@@ -232,7 +284,10 @@ def analyze_stock(stock_code: str) -> Dict:
             "macd": round(float(macd), 4),
             "trend": trend,
             "conditions": conditions,
-            "data_source": "simulated" if using_simulated_data else "external",
+            "data_source": "simulated" if using_simulated_data else ("stale" if using_stale_data else "external"),
+            "data_stale": using_stale_data,
+            "data_age_seconds": round(data_age, 1) if data_age is not None else None,
+            "data_fetched_at": hist.attrs.get(ATTR_FETCHED_AT),
             "analysis_timestamp": pd.Timestamp.now().isoformat()
         }
         
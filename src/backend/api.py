@@ -6,7 +6,7 @@ print("Files in current directory:", os.listdir("."))
 print("Files in src directory:", os.listdir("src"))
 print("Files in src/backend directory:", os.listdir("src/backend"))
 
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, Response, status
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import Optional, List
@@ -15,7 +15,7 @@ from datetime import datetime
 try:
     from backend.database import (criar_usuario, get_acoes_ativas, get_carteira, SessionLocal, 
                                      Acao, Carteira, Transacao, get_transacoes, criar_transacao, 
-                                     get_posicao_by_codigo)
+                                     get_posicao_by_codigo, init_db)
     print("✅ Successfully imported src.backend.database")
 except ImportError as e:
     print("❌ Error importing src.backend.database:", str(e))
@@ -63,6 +63,11 @@ app.add_middleware(
     max_age=3600,  # Cache das respostas OPTIONS por 1 hora
 )
 
+@app.on_event("startup")
+async def inicializar_banco():
+    """Cria as tabelas na inicialização do worker (não mais na importação de backend.database)"""
+    init_db()
+
 # Dependência para obter a sessão do banco
 def get_db():
     db = SessionLocal()
@@ -500,10 +505,10 @@ async def usuario_atual(usuario = Depends(obter_usuario_atual)):
 # Endpoint de análise
 @app.get("/api/acoes/{codigo}/analise")
 async def analisar_acao(codigo: str):
-    """Realiza análise técnica de uma ação específica usando múltiplos provedores, com lock e cache on-demand"""
+    """Realiza análise técnica de uma ação específica usando múltiplos provedores (busca assíncrona, cache on-demand)"""
     try:
-        from backend.app import analyze_stock_on_demand
-        analysis = analyze_stock_on_demand(codigo)
+        from backend.app import aanalyze_stock_on_demand
+        analysis = await aanalyze_stock_on_demand(codigo)
         analysis['codigo'] = codigo
         return analysis
     except Exception as e:
@@ -650,13 +655,33 @@ async def estatisticas_provedores():
     """Retorna estatísticas detalhadas dos provedores"""
     try:
         from backend.data_providers import data_manager
+        import pandas as pd
         
         stats = data_manager.get_provider_statistics()
+        open_circuits = [
+            name for name, provider_stats in stats.items()
+            if provider_stats['circuit_breaker'] and provider_stats['circuit_breaker']['state'] != 'closed'
+        ]
         
         return {
             "provider_statistics": stats,
             "total_active_providers": len(data_manager.providers),
+            "open_circuits": open_circuits,
+            "negative_cache": data_manager.negative_cache.to_dict() if data_manager.negative_cache is not None else None,
+            "quote_cache": data_manager.quote_cache.to_dict() if data_manager.quote_cache is not None else None,
+            "single_flight": data_manager.single_flight.to_dict() if data_manager.single_flight is not None else None,
+            "stale_cache": data_manager.stale_cache.to_dict() if data_manager.stale_cache is not None else None,
+            "ring_store": data_manager.ring_store.to_dict() if data_manager.ring_store is not None else None,
+            "shared_history": data_manager.shared_history.to_dict() if data_manager.shared_history is not None else None,
             "timestamp": pd.Timestamp.now().isoformat()
         }
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Erro ao obter estatísticas: {str(e)}") 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Erro ao obter estatísticas: {str(e)}")
+
+# Métricas Prometheus do processo da API (provedores de dados, cadeia de fallback)
+@app.get("/metrics")
+async def metricas():
+    """Exposição das métricas no formato texto do Prometheus"""
+    from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
+    
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -1,6 +1,7 @@
 import schedule
 import time
 import logging
+import os
 from datetime import datetime, time as dt_time
 from sqlalchemy.orm import Session
 from prometheus_client import start_http_server, Counter, Histogram, Gauge
@@ -8,9 +9,13 @@ import pandas as pd
 import numpy as np
 from collections import defaultdict
 from backend.analyzer import analyze_stock
+from backend.data_providers import data_manager
+from backend.config import DataProviderConfig
+from backend.quota import PRIORITY_HIGH, PRIORITY_LOW
 from backend.notifier import send_email_notification
-from backend.database import SessionLocal, Acao, Carteira, Usuario, get_acoes_ativas, get_carteira
+from backend.database import SessionLocal, Acao, Carteira, Usuario, get_acoes_ativas, get_carteira, init_db
 import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Configuração de logging
 logging.basicConfig(
@@ -25,6 +30,7 @@ logging.basicConfig(
 # Métricas Prometheus
 RECOMMENDATIONS_COUNTER = Counter('trading_recommendations_total', 'Total de recomendações', ['action', 'stock', 'user_id'])
 ANALYSIS_DURATION = Histogram('analysis_duration_seconds', 'Duração da análise em segundos')
+ANALYSIS_CYCLE_DURATION = Histogram('analysis_cycle_duration_seconds', 'Duração do ciclo completo de análise em segundos')
 RSI_GAUGE = Gauge('stock_rsi', 'RSI da ação', ['stock', 'user_id'])
 MACD_GAUGE = Gauge('stock_macd', 'MACD da ação', ['stock', 'user_id'])
 PRICE_GAUGE = Gauge('stock_price', 'Preço atual da ação', ['stock', 'user_id'])
@@ -36,6 +42,9 @@ ANALYSIS_ERRORS = Counter('analysis_errors_total', 'Total de erros na análise',
 analysis_cache = {}
 cache_timestamp = None
 
+# Número máximo de ações analisadas em paralelo por ciclo (1 = sequencial)
+ANALYSIS_MAX_WORKERS = int(os.environ.get('ANALYSIS_MAX_WORKERS', '4'))
+
 # Lock global para cada ação analisada on-demand
 analysis_locks = {}
 analysis_locks_global = threading.Lock()
@@ -96,6 +105,56 @@ def get_all_unique_stocks():
     finally:
         db.close()
 
+def get_portfolio_stocks():
+    """
+    Retorna o conjunto de ações com posição aberta na carteira de algum usuário ativo.
+    Essas ações têm prioridade no uso de provedores com cota diária.
+    """
+    db = SessionLocal()
+    try:
+        rows = db.query(Carteira.codigo).join(Usuario, Carteira.usuario_id == Usuario.id).filter(
+            Usuario.ativo == True
+        ).distinct().all()
+        return {row[0] for row in rows}
+    except Exception as e:
+        logging.error(f"❌ Erro ao coletar ações em carteira: {str(e)}")
+        return set()
+    finally:
+        db.close()
+
+def timed_analyze_stock(codigo_acao, priority=PRIORITY_HIGH):
+    """Analisa uma ação e retorna a análise junto com a duração em segundos"""
+    start_time = time.time()
+    analysis = analyze_stock(codigo_acao, priority=priority, deadline_s=DataProviderConfig.FETCH_DEADLINE_CYCLE)
+    return analysis, time.time() - start_time
+
+def prefetch_histories(stock_codes, priority_for):
+    """
+    Pré-carrega no histórico local os dados de todas as ações do ciclo usando as
+    buscas em lote dos provedores; as análises seguintes leem do armazenamento local
+    """
+    if data_manager.price_store is None:
+        return
+    
+    from backend.utils import normalize_stock_code
+    
+    symbols_by_priority = defaultdict(list)
+    for codigo_acao in stock_codes:
+        try:
+            symbols_by_priority[priority_for(codigo_acao)].append(normalize_stock_code(codigo_acao))
+        except ValueError:
+            continue
+    
+    for priority, symbols in symbols_by_priority.items():
+        try:
+            # Sem fallback individual: as análises percorrem a cadeia para o que faltar
+            fetched = data_manager.get_historical_data_batch(symbols, days=30, priority=priority, fallback=False,
+                                                             deadline_s=DataProviderConfig.FETCH_DEADLINE_CYCLE)
+            loaded = sum(1 for data in fetched.values() if data is not None)
+            logging.info(f"📦 Histórico pré-carregado para {loaded}/{len(symbols)} ações (prioridade {priority})")
+        except Exception as e:
+            logging.warning(f"⚠️ Falha ao pré-carregar históricos em lote: {str(e)}")
+
 def analyze_unique_stocks():
     """
     Analisa cada ação única apenas uma vez e armazena no cache compartilhado
@@ -120,45 +179,75 @@ def analyze_unique_stocks():
     
     logging.info(f"🎯 Iniciando análise de {total_stocks} ações únicas (afetando {total_users_affected} usuários)")
     
+    # Ações em carteira usam cotas de provedores premium mesmo quando reservadas
+    portfolio_stocks = get_portfolio_stocks()
+    
+    def priority_for(codigo_acao):
+        return PRIORITY_HIGH if codigo_acao in portfolio_stocks else PRIORITY_LOW
+    
+    # Busca o universo inteiro em poucas requisições antes das análises individuais
+    prefetch_histories(stocks_users.keys(), priority_for)
+    
     analysis_errors = []
     successful_analyses = 0
     
-    # Analisa cada ação única apenas uma vez
-    for i, (codigo_acao, user_ids) in enumerate(stocks_users.items(), 1):
-        try:
-            logging.info(f"📈 [{i}/{total_stocks}] Analisando {codigo_acao} (usuários: {len(user_ids)})...")
-            
-            start_time = time.time()
-            
-            # Realiza a análise (única por ação)
-            analysis = analyze_stock(codigo_acao)
-            
-            # Registra tempo de análise
-            duration = time.time() - start_time
-            ANALYSIS_DURATION.observe(duration)
-            
-            # Armazena no cache compartilhado
-            analysis_cache[codigo_acao] = {
-                'analysis': analysis,
-                'user_ids': user_ids,
-                'analyzed_at': datetime.now()
+    def handle_result(i, codigo_acao, user_ids, analysis, duration):
+        """Registra o resultado de uma análise no cache compartilhado"""
+        ANALYSIS_DURATION.observe(duration)
+        
+        # Armazena no cache compartilhado
+        analysis_cache[codigo_acao] = {
+            'analysis': analysis,
+            'user_ids': user_ids,
+            'analyzed_at': datetime.now()
+        }
+        
+        logging.info(f"✅ [{i}/{total_stocks}] {codigo_acao}: {analysis['current_position']}/{analysis['new_position']} - RSI: {analysis['rsi']:.2f}, MACD: {analysis['macd']:.2f} (duração: {duration:.2f}s)")
+    
+    def handle_error(codigo_acao, user_ids, e):
+        """Registra o erro de análise para todos os usuários da ação"""
+        error_msg = f"❌ Erro ao analisar {codigo_acao}: {str(e)}"
+        analysis_errors.append(error_msg)
+        logging.error(error_msg)
+        
+        for user_id in user_ids:
+            ANALYSIS_ERRORS.labels(stock=codigo_acao, user_id=user_id).inc()
+    
+    max_workers = min(ANALYSIS_MAX_WORKERS, total_stocks)
+    
+    if max_workers <= 1:
+        # Modo sequencial: analisa cada ação única apenas uma vez
+        for i, (codigo_acao, user_ids) in enumerate(stocks_users.items(), 1):
+            try:
+                logging.info(f"📈 [{i}/{total_stocks}] Analisando {codigo_acao} (usuários: {len(user_ids)})...")
+                analysis, duration = timed_analyze_stock(codigo_acao, priority_for(codigo_acao))
+                handle_result(i, codigo_acao, user_ids, analysis, duration)
+                successful_analyses += 1
+            except Exception as e:
+                handle_error(codigo_acao, user_ids, e)
+    else:
+        # Modo concorrente: as análises passam a maior parte do tempo esperando I/O dos provedores
+        logging.info(f"🧵 Analisando com até {max_workers} ações em paralelo")
+        
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='analysis') as executor:
+            futures = {
+                executor.submit(timed_analyze_stock, codigo_acao, priority_for(codigo_acao)): (codigo_acao, user_ids)
+                for codigo_acao, user_ids in stocks_users.items()
             }
             
-            successful_analyses += 1
-            
-            logging.info(f"✅ {codigo_acao}: {analysis['current_position']}/{analysis['new_position']} - RSI: {analysis['rsi']:.2f}, MACD: {analysis['macd']:.2f} (duração: {duration:.2f}s)")
-            
-        except Exception as e:
-            error_msg = f"❌ Erro ao analisar {codigo_acao}: {str(e)}"
-            analysis_errors.append(error_msg)
-            logging.error(error_msg)
-            
-            # Registra erro para todos os usuários desta ação
-            for user_id in user_ids:
-                ANALYSIS_ERRORS.labels(stock=codigo_acao, user_id=user_id).inc()
+            # Preenche o cache conforme os resultados chegam
+            for i, future in enumerate(as_completed(futures), 1):
+                codigo_acao, user_ids = futures[future]
+                try:
+                    analysis, duration = future.result()
+                    handle_result(i, codigo_acao, user_ids, analysis, duration)
+                    successful_analyses += 1
+                except Exception as e:
+                    handle_error(codigo_acao, user_ids, e)
     
     # Estatísticas finais
     total_time = (datetime.now() - cache_timestamp).total_seconds()
+    ANALYSIS_CYCLE_DURATION.observe(total_time)
     logging.info(f"🎯 Análise concluída: {successful_analyses}/{total_stocks} ações analisadas em {total_time:.2f}s")
     
     if analysis_errors:
@@ -201,6 +290,13 @@ def process_single_user_notifications(usuario, db):
     sell_signals = []
     all_analyses = []
     
+    # Posições da carteira avaliadas pela cotação atual (leve), não pelo fechamento da análise
+    positions = {
+        posicao.codigo: posicao
+        for posicao in db.query(Carteira).filter(Carteira.usuario_id == usuario.id).all()
+    }
+    quotes = data_manager.get_current_prices(list(positions), priority=PRIORITY_HIGH, fallback=False) if positions else {}
+    
     # Para cada ação no cache, verifica se o usuário a possui
     for codigo_acao, cache_data in analysis_cache.items():
         if usuario.id not in cache_data['user_ids']:
@@ -221,20 +317,29 @@ def process_single_user_notifications(usuario, db):
         })
         
         # Verifica se há posição na carteira do usuário
-        portfolio_position = db.query(Carteira).filter(
-            Carteira.codigo == codigo_acao, 
-            Carteira.usuario_id == usuario.id
-        ).first()
+        portfolio_position = positions.get(codigo_acao)
         
         # Lógica de notificação
         if portfolio_position:
-            # Tem a ação na carteira - verifica sinais de venda
-            if analysis['current_position'] == 'SELL':
+            # Tem a ação na carteira - verifica sinais de venda e stop loss/take profit na cotação atual
+            price = quotes.get(codigo_acao) or analysis['price']
+            if portfolio_position.stop_loss and price <= portfolio_position.stop_loss:
+                reason = 'STOP LOSS'
+            elif portfolio_position.take_profit and price >= portfolio_position.take_profit:
+                reason = 'TAKE PROFIT'
+            elif analysis['current_position'] == 'SELL':
+                reason = 'SELL'
+            else:
+                reason = None
+            
+            if reason:
                 RECOMMENDATIONS_COUNTER.labels(action='SELL', stock=codigo_acao, user_id=usuario.id).inc()
                 sell_signals.append({
                     'stock': codigo_acao,
                     'analysis': analysis,
-                    'position': portfolio_position
+                    'position': portfolio_position,
+                    'price': price,
+                    'reason': reason
                 })
         else:
             # Não tem a ação na carteira - verifica sinais de compra
@@ -303,9 +408,10 @@ def analyze_user_stocks(usuario_id):
     finally:
         db.close()
 
-def analyze_stock_on_demand(codigo_acao: str):
+def analyze_stock_on_demand(codigo_acao: str, deadline_s: float = None):
     """
     Analisa uma ação on-demand, com lock para evitar execuções simultâneas e salva no cache compartilhado.
+    deadline_s limita o tempo de busca dos dados (padrão: FETCH_DEADLINE_API).
     """
     global analysis_cache, cache_timestamp, analysis_locks, analysis_locks_global
     
@@ -322,7 +428,9 @@ def analyze_stock_on_demand(codigo_acao: str):
         
         # Faz análise e salva no cache
         from backend.analyzer import analyze_stock
-        analysis = analyze_stock(codigo_acao)
+        if deadline_s is None:
+            deadline_s = DataProviderConfig.FETCH_DEADLINE_API
+        analysis = analyze_stock(codigo_acao, deadline_s=deadline_s)
         analysis_cache[codigo_acao] = {
             'analysis': analysis,
             'user_ids': set(),  # on-demand pode não saber os usuários, mas pode ser atualizado depois
@@ -331,6 +439,30 @@ def analyze_stock_on_demand(codigo_acao: str):
         cache_timestamp = datetime.now()
         return analysis
 
+async def aanalyze_stock_on_demand(codigo_acao: str, deadline_s: float = None):
+    """
+    Versão assíncrona de analyze_stock_on_demand para os endpoints da API: a busca
+    dos dados roda no event loop (AsyncDataProviderManager), sem ocupar uma thread
+    por requisição. Buscas simultâneas da mesma ação são unificadas pelo gerenciador.
+    """
+    global cache_timestamp
+    
+    cached = analysis_cache.get(codigo_acao)
+    if cached is not None:
+        return cached['analysis']
+    
+    from backend.analyzer import aanalyze_stock
+    if deadline_s is None:
+        deadline_s = DataProviderConfig.FETCH_DEADLINE_API
+    analysis = await aanalyze_stock(codigo_acao, deadline_s=deadline_s)
+    analysis_cache.setdefault(codigo_acao, {
+        'analysis': analysis,
+        'user_ids': set(),
+        'analyzed_at': datetime.now()
+    })
+    cache_timestamp = datetime.now()
+    return analysis_cache[codigo_acao]['analysis']
+
 def send_user_analysis_summary_email(usuario, buy_signals, sell_signals, all_analyses, errors):
     """Envia email com resumo das análises de um usuário específico"""
     from datetime import datetime
@@ -408,7 +540,7 @@ def send_user_analysis_summary_email(usuario, buy_signals, sell_signals, all_ana
         for signal in sell_signals:
             analysis = signal['analysis']
             position = signal['position']
-            current_value = position.quantidade * analysis['price']
+            current_value = position.quantidade * signal['price']
             invested_value = position.quantidade * position.preco_medio
             profit_loss = current_value - invested_value
             profit_pct = (profit_loss / invested_value) * 100 if invested_value > 0 else 0
@@ -420,10 +552,10 @@ def send_user_analysis_summary_email(usuario, buy_signals, sell_signals, all_ana
                 <td><strong>{signal['stock']}</strong></td>
                 <td>{position.quantidade}</td>
                 <td>R$ {position.preco_medio:.2f}</td>
-                <td>R$ {analysis['price']:.2f}</td>
+                <td>R$ {signal['price']:.2f}</td>
                 <td style="color: {profit_color};">R$ {profit_loss:.2f} ({profit_pct:+.1f}%)</td>
                 <td>{analysis['rsi']:.1f}</td>
-                <td style="color: red;"><strong>{analysis['current_position']}</strong></td>
+                <td style="color: red;"><strong>{signal['reason']}</strong></td>
             </tr>
             """
         
@@ -529,6 +661,9 @@ def main():
     """Função principal do bot"""
     logging.info("🤖 Iniciando Trading Bot com sistema de cache otimizado...")
     
+    # Cria as tabelas na inicialização (não mais na importação de backend.database)
+    init_db()
+    
     # Inicia servidor de métricas Prometheus
     start_http_server(8000)
     logging.info("📊 Servidor de métricas iniciado na porta 8000")
@@ -0,0 +1,208 @@
+"""
+Gravação e reprodução (cassetes) das respostas HTTP dos provedores REST
+Em modo record as respostas reais de GET são gravadas em arquivos JSON; em modo
+replay são devolvidas desses arquivos, sem rede, com latência artificial
+configurável. Permite benchmarks determinísticos e offline da cadeia de fallback,
+do parsing e da análise com os mesmos payloads vistos em produção.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+from datetime import datetime
+from typing import Optional, Dict, Tuple
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+try:
+    import httpx  # Cliente assíncrono (opcional)
+except ImportError:
+    httpx = None
+
+from .config import DataProviderConfig
+
+logger = logging.getLogger(__name__)
+
+MODE_OFF = 'off'
+MODE_RECORD = 'record'
+MODE_REPLAY = 'replay'
+
+# Chaves de API nunca vão para o cassete; datas mudam a cada dia e não identificam a requisição
+SECRET_PARAMS = {'token', 'key', 'apikey', 'api_key'}
+VOLATILE_PARAMS = {'startDate', 'endDate', 'from', 'to'}
+
+class CassetteMissError(Exception):
+    """Não há resposta gravada para a requisição (modo replay)"""
+
+class CassetteStore:
+    """Arquivos de cassete: um JSON por requisição canônica, agrupados por host"""
+
+    def __init__(self, directory: Optional[str] = None, latency: Optional[float] = None,
+                 jitter: Optional[float] = None):
+        self.directory = directory or DataProviderConfig.HTTP_CASSETTE_DIR
+        self.latency = DataProviderConfig.HTTP_CASSETTE_LATENCY if latency is None else latency
+        self.jitter = DataProviderConfig.HTTP_CASSETTE_JITTER if jitter is None else jitter
+        self._lock = threading.Lock()
+        self.recorded = 0
+        self.replayed = 0
+        self.misses = 0
+
+    @staticmethod
+    def canonical_request(method: str, url: str) -> Tuple[str, str]:
+        """(host, requisição canônica) sem chaves de API, datas e ordem de parâmetros"""
+        parts = urlsplit(url)
+        params = sorted((name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+                        if name not in SECRET_PARAMS and name not in VOLATILE_PARAMS)
+        query = f"?{urlencode(params)}" if params else ''
+        return parts.netloc, f"{method.upper()} {parts.scheme}://{parts.netloc}{parts.path}{query}"
+
+    def _path(self, method: str, url: str) -> Tuple[str, str]:
+        host, canonical = self.canonical_request(method, url)
+        digest = hashlib.sha1(canonical.encode()).hexdigest()[:16]
+        return os.path.join(self.directory, host.replace(':', '_'), f"{digest}.json"), canonical
+
+    def save(self, method: str, url: str, status: int, content_type: str, body: str):
+        """Grava (ou substitui) a resposta de uma requisição"""
+        path, canonical = self._path(method, url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        entry = {
+            'request': canonical,
+            'recorded_at': datetime.now().isoformat(),
+            'status': status,
+            'content_type': content_type,
+            'body': body
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self.recorded += 1
+        logger.debug(f"📼 Gravado {canonical} ({status})")
+
+    def load(self, method: str, url: str) -> Dict:
+        """Resposta gravada da requisição (CassetteMissError se não houver)"""
+        path, canonical = self._path(method, url)
+        try:
+            with open(path, encoding='utf-8') as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            raise CassetteMissError(f"Sem cassete para {canonical}")
+
+        with self._lock:
+            self.replayed += 1
+        return entry
+
+    def replay_delay(self) -> float:
+        """Latência artificial de uma resposta reproduzida"""
+        return self.latency + (random.uniform(0, self.jitter) if self.jitter > 0 else 0.0)
+
+    def to_dict(self) -> Dict:
+        """Resumo serializável"""
+        with self._lock:
+            return {
+                'directory': self.directory,
+                'recorded': self.recorded,
+                'replayed': self.replayed,
+                'misses': self.misses
+            }
+
+class CassetteAdapter(HTTPAdapter):
+    """HTTPAdapter (requests) que grava ou reproduz as respostas de GET"""
+
+    def __init__(self, mode: str, store: CassetteStore, **kwargs):
+        super().__init__(**kwargs)
+        self.mode = mode
+        self.store = store
+
+    def send(self, request, **kwargs):
+        if request.method != 'GET' or self.mode not in (MODE_RECORD, MODE_REPLAY):
+            return super().send(request, **kwargs)
+
+        if self.mode == MODE_REPLAY:
+            try:
+                entry = self.store.load(request.method, request.url)
+            except CassetteMissError as e:
+                # Falha de conexão: a cadeia segue para o próximo provedor sem marcar "não encontrado"
+                raise requests.exceptions.ConnectionError(str(e), request=request)
+
+            time.sleep(self.store.replay_delay())
+            response = requests.Response()
+            response.status_code = entry['status']
+            response.headers = CaseInsensitiveDict({'content-type': entry['content_type']})
+            response._content = entry['body'].encode('utf-8')
+            response.encoding = 'utf-8'
+            response.url = request.url
+            response.request = request
+            return response
+
+        response = super().send(request, **kwargs)
+        self.store.save(request.method, request.url, response.status_code,
+                        response.headers.get('content-type', ''), response.text)
+        return response
+
+class CassetteTransport(httpx.AsyncBaseTransport if httpx is not None else object):
+    """Transport httpx assíncrono equivalente ao CassetteAdapter"""
+
+    def __init__(self, mode: str, store: CassetteStore, transport: 'httpx.AsyncBaseTransport'):
+        self.mode = mode
+        self.store = store
+        self.transport = transport
+
+    async def handle_async_request(self, request: 'httpx.Request') -> 'httpx.Response':
+        if request.method != 'GET' or self.mode not in (MODE_RECORD, MODE_REPLAY):
+            return await self.transport.handle_async_request(request)
+
+        url = str(request.url)
+        if self.mode == MODE_REPLAY:
+            try:
+                entry = self.store.load(request.method, url)
+            except CassetteMissError as e:
+                raise httpx.ConnectError(str(e), request=request)
+
+            await asyncio.sleep(self.store.replay_delay())
+            return httpx.Response(entry['status'], headers={'content-type': entry['content_type']},
+                                  content=entry['body'].encode('utf-8'), request=request)
+
+        response = await self.transport.handle_async_request(request)
+        body = await response.aread()
+        await response.aclose()
+        content_type = response.headers.get('content-type', '')
+
+        # Já descomprimido: devolve só o content-type para não decodificar de novo
+        self.store.save(request.method, url, response.status_code, content_type,
+                        body.decode('utf-8', errors='replace'))
+        return httpx.Response(response.status_code, headers={'content-type': content_type},
+                              content=body, request=request)
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+_store: Optional[CassetteStore] = None
+_store_lock = threading.Lock()
+
+def cassette_mode() -> str:
+    """Modo configurado em HTTP_CASSETTE_MODE (valores desconhecidos equivalem a off)"""
+    mode = DataProviderConfig.HTTP_CASSETTE_MODE
+    return mode if mode in (MODE_RECORD, MODE_REPLAY) else MODE_OFF
+
+def get_cassette_store() -> CassetteStore:
+    """Armazenamento de cassetes compartilhado do processo"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = CassetteStore()
+            logger.info(f"📼 Cassetes HTTP em modo {cassette_mode()} ({_store.directory})")
+        return _store
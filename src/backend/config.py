@@ -19,14 +19,17 @@ class DataProviderConfig:
     # HG Finance
     HG_FINANCE_API_KEY: Optional[str] = os.environ.get('HG_FINANCE_API_KEY')
     HG_FINANCE_ENABLED: bool = True  # Funciona com e sem API key
+    HG_FINANCE_BASE_URL: str = os.environ.get('HG_FINANCE_BASE_URL', 'https://api.hgbrasil.com/finance')
     
     # BrAPI
     BRAPI_API_KEY: Optional[str] = os.environ.get('BRAPI_API_KEY')
     BRAPI_ENABLED: bool = True  # Funciona com e sem API key
+    BRAPI_BASE_URL: str = os.environ.get('BRAPI_BASE_URL', 'https://brapi.dev/api')
     
     # Tiingo
     TIINGO_API_KEY: Optional[str] = os.environ.get('TIINGO_API_KEY')
     TIINGO_ENABLED: bool = True  # Funciona com e sem API key
+    TIINGO_BASE_URL: str = os.environ.get('TIINGO_BASE_URL', 'https://api.tiingo.com/tiingo/daily')
     
     # Yahoo Finance
     YAHOO_ENABLED: bool = True  # Gratuito
@@ -36,12 +39,112 @@ class DataProviderConfig:
     
     # MFinance
     MFINANCE_ENABLED: bool = True  # Gratuito
+    MFINANCE_BASE_URL: str = os.environ.get('MFINANCE_BASE_URL', 'https://mfinance.com.br/api/v1')
     
     # Configurações gerais
     DEFAULT_TIMEOUT: int = 10  # segundos
     MAX_RETRIES: int = 3
     CACHE_DURATION: int = 300  # 5 minutos em segundos
     
+    # Prazo total de uma busca na cadeia de provedores (segundos; 0 = sem prazo)
+    FETCH_DEADLINE_API: float = float(os.environ.get('FETCH_DEADLINE_API', '15'))  # análises on-demand da API
+    FETCH_DEADLINE_CYCLE: float = float(os.environ.get('FETCH_DEADLINE_CYCLE', '60'))  # ciclos agendados do bot
+    
+    # Pool de conexões HTTP compartilhado pelos provedores REST
+    HTTP_POOL_HOSTS: int = int(os.environ.get('HTTP_POOL_HOSTS', '10'))  # hosts com pool próprio
+    HTTP_POOL_SIZE: int = int(os.environ.get('HTTP_POOL_SIZE', '20'))  # conexões por host
+    HTTP_MAX_RETRIES: int = int(os.environ.get('HTTP_MAX_RETRIES', '1'))  # falhas de conexão e 429/503
+    HTTP_RETRY_BACKOFF: float = float(os.environ.get('HTTP_RETRY_BACKOFF', '0.25'))  # segundos antes da retentativa
+    ASYNC_MAX_CONCURRENCY: int = int(os.environ.get('ASYNC_MAX_CONCURRENCY', '100'))  # requisições assíncronas simultâneas
+    BATCH_SIZE: int = int(os.environ.get('BATCH_SIZE', '20'))  # símbolos por requisição nas buscas em lote
+    
+    # Gravação/reprodução das respostas HTTP dos provedores REST (off, record ou replay)
+    HTTP_CASSETTE_MODE: str = os.environ.get('HTTP_CASSETTE_MODE', 'off').lower()
+    HTTP_CASSETTE_DIR: str = os.environ.get('HTTP_CASSETTE_DIR', 'config/cassettes')
+    HTTP_CASSETTE_LATENCY: float = float(os.environ.get('HTTP_CASSETTE_LATENCY', '0'))  # segundos por resposta reproduzida
+    HTTP_CASSETTE_JITTER: float = float(os.environ.get('HTTP_CASSETTE_JITTER', '0'))  # variação uniforme extra (segundos)
+    
+    # Requisições "hedged": dispara o próximo provedor se o atual demorar
+    HEDGE_ENABLED: bool = os.environ.get('HEDGE_ENABLED', 'false').lower() == 'true'
+    HEDGE_DELAY: float = float(os.environ.get('HEDGE_DELAY', '2.0'))  # segundos
+    HEDGE_MAX_PARALLEL: int = int(os.environ.get('HEDGE_MAX_PARALLEL', '3'))
+    
+    # Ordenação adaptativa dos provedores por taxa de sucesso e latência
+    ADAPTIVE_ORDERING: bool = os.environ.get('ADAPTIVE_ORDERING', 'false').lower() == 'true'
+    ADAPTIVE_WINDOW: int = int(os.environ.get('ADAPTIVE_WINDOW', '50'))  # tentativas por provedor
+    ADAPTIVE_MIN_SAMPLES: int = int(os.environ.get('ADAPTIVE_MIN_SAMPLES', '5'))
+    ADAPTIVE_FAILURE_PENALTY: float = float(os.environ.get('ADAPTIVE_FAILURE_PENALTY', '10.0'))  # segundos
+    ADAPTIVE_RERANK_INTERVAL: int = int(os.environ.get('ADAPTIVE_RERANK_INTERVAL', '20'))  # tentativas entre reordenações
+    
+    # Circuit breaker por provedor
+    CIRCUIT_FAILURE_THRESHOLD: int = int(os.environ.get('CIRCUIT_FAILURE_THRESHOLD', '5'))  # falhas consecutivas
+    CIRCUIT_RECOVERY_TIMEOUT: float = float(os.environ.get('CIRCUIT_RECOVERY_TIMEOUT', '300'))  # segundos
+    
+    # Cache negativo: pares (provedor, símbolo) que o provedor respondeu não existir
+    NEGATIVE_CACHE_ENABLED: bool = os.environ.get('NEGATIVE_CACHE_ENABLED', 'true').lower() == 'true'
+    NEGATIVE_CACHE_TTL: float = float(os.environ.get('NEGATIVE_CACHE_TTL', '21600'))  # 6 horas em segundos
+    
+    # Memória da variante de endpoint que funcionou por (provedor, símbolo)
+    ENDPOINT_MEMORY_ENABLED: bool = os.environ.get('ENDPOINT_MEMORY_ENABLED', 'true').lower() == 'true'
+    ENDPOINT_MEMORY_SIZE: int = int(os.environ.get('ENDPOINT_MEMORY_SIZE', '1000'))  # símbolos lembrados por provedor
+    
+    # Cache de cotações (último preço) em memória; 0 desabilita
+    QUOTE_CACHE_TTL: float = float(os.environ.get('QUOTE_CACHE_TTL', '60'))  # segundos
+    
+    # Chamadas concorrentes de get_historical_data para o mesmo (símbolo, dias) compartilham uma busca
+    COALESCE_ENABLED: bool = os.environ.get('COALESCE_ENABLED', 'true').lower() == 'true'
+    
+    # Stale-if-error: último histórico real por símbolo servido (marcado como antigo) quando os provedores falham
+    STALE_IF_ERROR_ENABLED: bool = os.environ.get('STALE_IF_ERROR_ENABLED', 'true').lower() == 'true'
+    STALE_MAX_AGE: float = float(os.environ.get('STALE_MAX_AGE', '259200'))  # 3 dias em segundos (cobre fins de semana)
+    STALE_CACHE_SIZE: int = int(os.environ.get('STALE_CACHE_SIZE', '500'))  # símbolos mantidos em memória
+    
+    # Histórico em memória por símbolo (buffers circulares): consultas repetidas no mesmo ciclo não buscam de novo
+    RING_STORE_ENABLED: bool = os.environ.get('RING_STORE_ENABLED', 'true').lower() == 'true'
+    RING_STORE_CAPACITY: int = int(os.environ.get('RING_STORE_CAPACITY', '512'))  # candles por símbolo
+    RING_STORE_SIZE: int = int(os.environ.get('RING_STORE_SIZE', '500'))  # símbolos mantidos em memória
+    RING_STORE_TTL: float = float(os.environ.get('RING_STORE_TTL', '300'))  # segundos em que o histórico é reaproveitado
+    
+    # Histórico compartilhado entre contêineres em arquivos mapeados em memória: o bot grava, a API lê
+    HISTORY_MMAP_ROLE: str = os.environ.get('HISTORY_MMAP_ROLE', 'off').lower()  # off, writer ou reader
+    HISTORY_MMAP_DIR: str = os.environ.get('HISTORY_MMAP_DIR', 'config/history')
+    HISTORY_MMAP_CAPACITY: int = int(os.environ.get('HISTORY_MMAP_CAPACITY', '512'))  # candles por símbolo
+    HISTORY_MMAP_MAX_AGE: float = float(os.environ.get('HISTORY_MMAP_MAX_AGE', '5400'))  # segundos (1,5 ciclo horário do bot)
+    
+    # Limites de taxa por provedor: (requisições/segundo, rajada)
+    # Baseados nos planos gratuitos descritos em API_SETUP_INSTRUCTIONS
+    RATE_LIMITS: dict = {
+        'MFinance': (2.0, 5),
+        'Tiingo': (500 / 3600, 10),          # 500 requests per hour
+        'HG Finance': (1.0, 3),              # Limitado sem chave
+        'BrAPI': (1.0, 3),                   # Limitado sem chave
+        'Yahoo Finance': (2.0, 5),
+        'InvestPy': (0.5, 2),
+        'Alpha Vantage': (5 / 60, 5),        # 5 calls per minute
+        'Quandl': (1.0, 2),                  # Limite diário tratado à parte
+    }
+    DEFAULT_RATE_LIMIT: tuple = (1.0, 3)
+    
+    # Cotas diárias dos provedores (planos gratuitos em API_SETUP_INSTRUCTIONS)
+    QUOTA_ENABLED: bool = os.environ.get('QUOTA_ENABLED', 'true').lower() == 'true'
+    QUOTA_DB_PATH: str = os.environ.get('QUOTA_DB_PATH', 'config/provider_quota.db')
+    DAILY_QUOTAS: dict = {
+        'Alpha Vantage': 500,    # 500 calls per day
+        'Tiingo': 1000,          # 1000 requests per day
+        'Quandl': 50,            # 50 calls per day without key
+    }
+    
+    # Pregão usado para distribuir as cotas entre os ciclos horários
+    MARKET_OPEN_HOUR: int = 9
+    MARKET_CLOSE_HOUR: int = 17
+    
+    # Armazenamento local de histórico (atualização incremental)
+    PRICE_STORE_ENABLED: bool = os.environ.get('PRICE_STORE_ENABLED', 'true').lower() == 'true'
+    PRICE_STORE_PATH: str = os.environ.get('PRICE_STORE_PATH', 'config/price_history.db')
+    
+    # Semente dos dados simulados (mesma semente = mesmos dados em todas as execuções e workers)
+    SIMULATION_SEED: int = int(os.environ.get('SIMULATION_SEED', '0'))
+    
     @classmethod
     def get_provider_priority(cls) -> list:
         """Retorna a ordem de prioridade dos provedores"""
@@ -56,6 +159,34 @@ class DataProviderConfig:
             'Quandl',          # 8º - Datasets variados mas nem sempre atualizados
         ]
     
+    @classmethod
+    def get_rate_limit(cls, provider_name: str) -> tuple:
+        """
+        Retorna (requisições/segundo, rajada) de um provedor.
+        Pode ser sobrescrito por variável de ambiente, ex: RATE_LIMIT_HG_FINANCE=0.5,2
+        """
+        env_var = 'RATE_LIMIT_' + provider_name.upper().replace(' ', '_')
+        override = os.environ.get(env_var)
+        if override:
+            rate, burst = override.split(',')
+            return float(rate), int(burst)
+        return cls.RATE_LIMITS.get(provider_name, cls.DEFAULT_RATE_LIMIT)
+    
+    @classmethod
+    def get_daily_quota(cls, provider_name: str) -> Optional[int]:
+        """
+        Retorna a cota diária de um provedor (None se ilimitado).
+        Pode ser sobrescrita por variável de ambiente, ex: DAILY_QUOTA_TIINGO=2000
+        """
+        if provider_name == 'Quandl' and cls.QUANDL_API_KEY:
+            return None  # Ilimitado com chave
+        
+        env_var = 'DAILY_QUOTA_' + provider_name.upper().replace(' ', '_')
+        override = os.environ.get(env_var)
+        if override:
+            return int(override)
+        return cls.DAILY_QUOTAS.get(provider_name)
+    
     @classmethod
     def get_enabled_providers(cls) -> dict:
         """Retorna status dos provedores habilitados"""
@@ -266,6 +266,3 @@ def get_usuario_por_id(usuario_id):
         return db.query(Usuario).filter(Usuario.id == usuario_id, Usuario.ativo == True).first()
     finally:
         db.close()
-
-# Inicializa o banco de dados na importação do módulo
-init_db() 
\ No newline at end of file
@@ -0,0 +1,56 @@
+"""
+Prazo total (deadline) de uma busca na cadeia de provedores
+O prazo vive em uma ContextVar: o gerenciador o define na entrada da chamada e
+cada provedor lê o tempo restante para limitar timeouts HTTP e esperas do rate
+limiter, sem precisar receber o prazo como argumento. Tarefas asyncio e
+asyncio.to_thread herdam o contexto; threads de executores precisam de
+contextvars.copy_context().
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+# Instante (time.monotonic) em que a chamada atual expira; None = sem prazo
+_deadline: ContextVar[Optional[float]] = ContextVar('provider_deadline', default=None)
+
+# Abaixo disso não vale a pena abrir uma requisição
+MIN_REQUEST_TIME = 0.05
+
+@contextmanager
+def deadline_scope(deadline_s: Optional[float]) -> Iterator[None]:
+    """
+    Limita o tempo das buscas feitas dentro do bloco a deadline_s segundos
+
+    Escopos aninhados nunca estendem o prazo de fora; None ou valores <= 0
+    mantêm o prazo atual (ou nenhum).
+    """
+    if deadline_s is None or deadline_s <= 0:
+        yield
+        return
+
+    deadline = time.monotonic() + deadline_s
+    current = _deadline.get()
+    token = _deadline.set(deadline if current is None else min(current, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+def remaining() -> Optional[float]:
+    """Segundos restantes do prazo atual (None se não houver prazo)"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return max(deadline - time.monotonic(), 0.0)
+
+def expired() -> bool:
+    """Indica se o prazo atual não comporta mais nenhuma requisição"""
+    left = remaining()
+    return left is not None and left < MIN_REQUEST_TIME
+
+def clip_timeout(timeout: float) -> float:
+    """Timeout de uma requisição limitado ao tempo restante do prazo"""
+    left = remaining()
+    return timeout if left is None else max(min(timeout, left), MIN_REQUEST_TIME)
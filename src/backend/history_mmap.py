@@ -0,0 +1,298 @@
+"""
+Histórico por símbolo em arquivos mapeados em memória, compartilhado entre processos
+O bot (app.py) grava cada histórico real que obtém em HISTORY_MMAP_DIR (volume
+./config, comum aos contêineres); a API abre os mesmos arquivos somente leitura e
+atende as análises dos símbolos monitorados sem consultar provedores nem
+desserializar nada: as páginas do arquivo são as mesmas do cache do sistema.
+
+Um arquivo por símbolo, layout fixo (little-endian):
+
+    0    magic 'OHLCVRB1'
+    8    int64[5]: capacidade, sequência, candles, próxima posição, maior janela obtida
+    48   float64: obtido em (timestamp Unix)
+    56   64 bytes: provedor de origem (UTF-8, completado com zeros)
+    128  colunas datas (datetime64[ns]), open, high, low, close (float64), volume (int64),
+         cada uma com 2 x capacidade posições (buffer circular de ring_store)
+
+Concorrência (seqlock): há um único processo gravador; ele torna a sequência
+ímpar antes de alterar o arquivo e par ao terminar. O leitor copia a janela pedida
+e só a aceita se a sequência era par e não mudou durante a cópia, então nunca vê
+um candle pela metade, e tenta de novo caso contrário.
+"""
+
+import logging
+import mmap
+import os
+import re
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .ohlcv_parser import normalize_ohlcv
+from .ring_store import HistoryWindow, SymbolRing, RING_COLUMNS, BAR_BYTES
+from .stale_cache import ATTR_FETCHED_AT
+
+logger = logging.getLogger(__name__)
+
+ROLE_OFF = 'off'
+ROLE_WRITER = 'writer'
+ROLE_READER = 'reader'
+
+MAGIC = b'OHLCVRB1'
+HEADER_SIZE = 128
+SOURCE_SIZE = 64
+META_CAPACITY, META_SEQUENCE = 0, 1  # Posições 2 a 4 são o estado do SymbolRing
+FILE_SUFFIX = '.ohlcv'
+
+# Tentativas de leitura enquanto o gravador altera o arquivo
+READ_RETRIES = 100
+
+_SYMBOL_PATTERN = re.compile(r'^[A-Z0-9][A-Z0-9._-]{0,31}$')
+
+def file_size(capacity: int) -> int:
+    """Tamanho em bytes do arquivo de um símbolo"""
+    return HEADER_SIZE + 2 * capacity * BAR_BYTES
+
+class MappedRing(SymbolRing):
+    """SymbolRing cujas colunas e estado são visões de um arquivo mapeado em memória"""
+
+    def __init__(self, path: str, writable: bool, capacity: Optional[int] = None):
+        """
+        Abre (ou, para o gravador com capacity, cria) o arquivo de um símbolo
+
+        Raises:
+            ValueError: Arquivo com layout desconhecido ou incompleto
+        """
+        self.path = path
+        self.writable = writable
+        self._lock = threading.Lock()
+
+        if writable and capacity is not None and not os.path.exists(path):
+            self._create(path, capacity)
+
+        with open(path, 'r+b' if writable else 'rb') as f:
+            self.inode = os.fstat(f.fileno()).st_ino
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+
+        if self._map[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path}: arquivo de histórico inválido")
+        self.meta = np.ndarray((5,), dtype='<i8', buffer=self._map, offset=len(MAGIC))
+        self._fetched_at = np.ndarray((1,), dtype='<f8', buffer=self._map, offset=48)
+
+        file_capacity = int(self.meta[META_CAPACITY])
+        if len(self._map) != file_size(file_capacity):
+            raise ValueError(f"{path}: tamanho incompatível com a capacidade {file_capacity}")
+
+        columns = {}
+        offset = HEADER_SIZE
+        for name, dtype in RING_COLUMNS:
+            columns[name] = np.ndarray((2 * file_capacity,), dtype=dtype, buffer=self._map, offset=offset)
+            offset += 2 * file_capacity * 8
+        super().__init__(file_capacity, columns, self.meta[2:])
+
+    @staticmethod
+    def _create(path: str, capacity: int):
+        """Cria o arquivo vazio atomicamente (leitores nunca veem um arquivo parcial)"""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.truncate(file_size(capacity))
+            f.write(MAGIC)
+            f.write(np.array([capacity], dtype='<i8').tobytes())
+        os.replace(tmp_path, path)
+
+    @property
+    def fetched_at(self) -> Optional[datetime]:
+        timestamp = float(self._fetched_at[0])
+        return datetime.fromtimestamp(timestamp) if timestamp > 0 else None
+
+    @fetched_at.setter
+    def fetched_at(self, value: Optional[datetime]):
+        self._fetched_at[0] = value.timestamp() if value is not None else 0.0
+
+    @property
+    def source(self) -> Optional[str]:
+        raw = self._map[56:56 + SOURCE_SIZE].rstrip(b'\0')
+        return raw.decode('utf-8', errors='replace') or None
+
+    @source.setter
+    def source(self, value: Optional[str]):
+        raw = (value or '').encode('utf-8')[:SOURCE_SIZE]
+        self._map[56:56 + SOURCE_SIZE] = raw.ljust(SOURCE_SIZE, b'\0')
+
+    def merge(self, data: pd.DataFrame, days: int, fetched_at: datetime, source: Optional[str]) -> Tuple[int, bool]:
+        """SymbolRing.merge dentro de uma seção de escrita do seqlock"""
+        with self._lock:
+            self.meta[META_SEQUENCE] += 1
+            try:
+                return super().merge(data, days, fetched_at, source)
+            finally:
+                self.meta[META_SEQUENCE] += 1
+
+    def snapshot(self, days: int) -> Optional[Tuple[HistoryWindow, int]]:
+        """
+        Cópia consistente dos últimos `days` candles e da maior janela obtida
+
+        Returns:
+            (janela, history_days) ou None se o gravador não liberou o arquivo a tempo
+        """
+        for attempt in range(READ_RETRIES):
+            sequence = int(self.meta[META_SEQUENCE])
+            if sequence % 2 == 0:
+                count = min(max(self.count, 0), self.capacity)
+                position = self.position % self.capacity
+                n = min(max(days, 0), count)
+                end = position + self.capacity
+                copies = {name: np.array(self.columns[name][end - n:end]) for name, _ in RING_COLUMNS}
+                history_days, fetched_at, source = self.history_days, self.fetched_at, self.source
+
+                if int(self.meta[META_SEQUENCE]) == sequence:
+                    return HistoryWindow(fetched_at=fetched_at, source=source, **copies), history_days
+            time.sleep(0 if attempt < 10 else 0.001)
+        return None
+
+    def close(self):
+        """Desfaz o mapeamento (se ainda houver visões em uso, fica para a coleta de lixo)"""
+        try:
+            self._map.close()
+        except BufferError:
+            pass
+
+class SharedHistory:
+    """
+    Diretório de arquivos de histórico mapeados em memória
+
+    writable=True (bot) cria e atualiza os arquivos; writable=False (API) só lê e
+    reabre um arquivo quando o gravador o recria.
+    """
+
+    def __init__(self, directory: str, writable: bool, capacity: int = 512):
+        self.directory = directory
+        self.writable = writable
+        self.capacity = max(1, capacity)
+        self._lock = threading.Lock()
+        self._rings: Dict[str, MappedRing] = {}
+        self.writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.retries_exhausted = 0
+        if writable:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, symbol: str) -> Optional[str]:
+        if not _SYMBOL_PATTERN.match(symbol):
+            return None
+        return os.path.join(self.directory, f"{symbol}{FILE_SUFFIX}")
+
+    def _open(self, symbol: str) -> Optional[MappedRing]:
+        """Arquivo mapeado do símbolo (None se não existir ou for inválido)"""
+        path = self._path(symbol)
+        if path is None:
+            return None
+
+        with self._lock:
+            ring = self._rings.get(symbol)
+            if ring is not None and not self.writable:
+                # Arquivo recriado pelo gravador (ex: outra capacidade): reabre
+                try:
+                    if os.stat(path).st_ino != ring.inode:
+                        ring = None
+                except FileNotFoundError:
+                    ring = None
+            if ring is not None:
+                return ring
+
+            try:
+                ring = MappedRing(path, self.writable, self.capacity if self.writable else None)
+                if self.writable and ring.capacity != self.capacity:
+                    raise ValueError(f"{path}: capacidade {ring.capacity} diferente da configurada ({self.capacity})")
+            except FileNotFoundError:
+                return None
+            except (ValueError, OSError) as e:
+                if not self.writable:
+                    logger.warning(f"⚠️ Histórico compartilhado de {symbol} indisponível: {str(e)}")
+                    return None
+                # Gravador: recria o arquivo vazio (os leitores percebem pelo inode e reabrem)
+                logger.warning(f"⚠️ Recriando histórico compartilhado de {symbol}: {str(e)}")
+                try:
+                    MappedRing._create(path, self.capacity)
+                    ring = MappedRing(path, self.writable)
+                except (ValueError, OSError) as e:
+                    logger.error(f"💥 Histórico compartilhado de {symbol} indisponível: {str(e)}")
+                    return None
+
+            old = self._rings.pop(symbol, None)
+            if old is not None:
+                old.close()
+            self._rings[symbol] = ring
+            return ring
+
+    def write(self, symbol: str, data: Optional[pd.DataFrame], source: Optional[str], days: int) -> int:
+        """Incorpora o histórico obtido ao arquivo do símbolo; retorna quantos candles foram gravados"""
+        if not self.writable:
+            raise PermissionError("Histórico compartilhado aberto somente para leitura")
+
+        fetched_at = data.attrs.get(ATTR_FETCHED_AT) if data is not None else None
+        fetched_at = datetime.fromisoformat(fetched_at) if fetched_at else datetime.now()
+
+        data = normalize_ohlcv(data)
+        ring = self._open(symbol) if data is not None else None
+        if ring is None:
+            return 0
+
+        written, _ = ring.merge(data, days, fetched_at, source)
+        with self._lock:
+            self.writes += 1
+        return written
+
+    def read(self, symbol: str, days: int, max_age: Optional[float] = None) -> Optional[HistoryWindow]:
+        """
+        Últimos `days` candles do símbolo (cópia consistente), ou None se não houver
+        arquivo, ele não cobrir a janela pedida ou tiver mais de max_age segundos
+        """
+        ring = self._open(symbol)
+        result = ring.snapshot(days) if ring is not None and days <= ring.capacity else None
+
+        window = None
+        if result is not None:
+            window, history_days = result
+            age = (datetime.now() - window.fetched_at).total_seconds() if window.fetched_at is not None else None
+            if history_days < days or len(window.dates) == 0 or age is None or (max_age is not None and age > max_age):
+                window = None
+
+        with self._lock:
+            if ring is not None and days <= ring.capacity and result is None:
+                self.retries_exhausted += 1
+            if window is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return window
+
+    def frame(self, symbol: str, days: int, max_age: Optional[float] = None) -> Optional[pd.DataFrame]:
+        """Como read(), em DataFrame OHLCV"""
+        window = self.read(symbol, days, max_age)
+        return window.to_frame() if window is not None else None
+
+    def close(self):
+        with self._lock:
+            for ring in self._rings.values():
+                ring.close()
+            self._rings.clear()
+
+    def to_dict(self) -> Dict:
+        """Resumo serializável"""
+        with self._lock:
+            return {
+                'directory': self.directory,
+                'role': ROLE_WRITER if self.writable else ROLE_READER,
+                'open_files': len(self._rings),
+                'capacity': self.capacity,
+                'writes': self.writes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'retries_exhausted': self.retries_exhausted
+            }
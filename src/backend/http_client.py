@@ -0,0 +1,164 @@
+"""
+Cliente HTTP compartilhado
+Sessão com pool de conexões keep-alive por host e uma retentativa curta para
+falhas de conexão e 429/503 (5xx persistentes ficam com o fallback e o circuit breaker),
+usada por todos os provedores REST e pelo envio de notificações, e fábrica
+do cliente assíncrono (httpx) usado pelo AsyncDataProviderManager. Com
+HTTP_CASSETTE_MODE em record/replay, ambos passam pelos cassetes (backend.cassette).
+"""
+
+import threading
+import logging
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import httpx  # Cliente assíncrono (opcional)
+except ImportError:
+    httpx = None
+
+from .config import DataProviderConfig
+from .cassette import CassetteAdapter, CassetteTransport, cassette_mode, get_cassette_store, MODE_OFF
+from .deadline import remaining
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+    'Accept': 'application/json',
+    'Accept-Language': 'pt-BR,pt;q=0.9,en;q=0.8'
+}
+
+# Respostas repetidas na camada de transporte: sobrecarga momentânea
+RETRY_STATUSES = (429, 503)
+
+class ShortBackoffRetry(Retry):
+    """Retry com espera fixa de backoff_factor segundos antes de cada retentativa"""
+
+    def get_backoff_time(self) -> float:
+        return min(self.backoff_factor, self.backoff_max) if self.history else 0.0
+
+# Política usada quando o prazo da busca não comporta retentativas
+NO_RETRY = Retry(total=0, raise_on_status=False)
+
+class DeadlineRetryMixin:
+    """
+    Adaptador cujas retentativas respeitam o prazo da busca (backend.deadline)
+
+    Cada retentativa repetiria o timeout já limitado ao tempo restante, então, com um
+    prazo ativo, elas só são feitas se o restante comporta todas as tentativas com
+    DEFAULT_TIMEOUT completo; caso contrário a requisição é única. A política vem da
+    ContextVar do prazo, portanto vale por requisição mesmo com a sessão compartilhada.
+    """
+
+    @property
+    def max_retries(self) -> Retry:
+        retry = self._base_retries
+        left = remaining()
+        if left is None or not retry.total:
+            return retry
+        needed = (retry.total + 1) * DataProviderConfig.DEFAULT_TIMEOUT + retry.total * retry.backoff_factor
+        return retry if left >= needed else NO_RETRY
+
+    @max_retries.setter
+    def max_retries(self, value: Retry):
+        self._base_retries = value
+
+class DeadlineHTTPAdapter(DeadlineRetryMixin, HTTPAdapter):
+    """HTTPAdapter com retentativas limitadas pelo prazo"""
+
+class DeadlineCassetteAdapter(DeadlineRetryMixin, CassetteAdapter):
+    """CassetteAdapter com retentativas limitadas pelo prazo"""
+
+def create_http_session(pool_size: Optional[int] = None, max_retries: Optional[int] = None,
+                        backoff_factor: Optional[float] = None) -> requests.Session:
+    """
+    Cria uma sessão HTTP com pool de conexões e retentativas
+
+    Args:
+        pool_size: Conexões mantidas abertas por host
+        max_retries: Retentativas para falhas de conexão e respostas 429/503
+        backoff_factor: Espera em segundos antes de cada retentativa
+
+    Returns:
+        Sessão configurada
+    """
+    pool_size = pool_size or DataProviderConfig.HTTP_POOL_SIZE
+    max_retries = DataProviderConfig.HTTP_MAX_RETRIES if max_retries is None else max_retries
+    backoff_factor = DataProviderConfig.HTTP_RETRY_BACKOFF if backoff_factor is None else backoff_factor
+
+    # Outros 5xx não são repetidos aqui: cada retentativa multiplicaria o custo de um
+    # provedor fora do ar, que a cadeia de fallback e o circuit breaker já tratam
+    retry = ShortBackoffRetry(
+        total=max_retries,
+        read=0,  # Timeout de leitura não é repetido: multiplicaria a latência do fallback
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(['GET', 'HEAD']),  # Apenas requisições idempotentes
+        respect_retry_after_header=False,  # Retry-After pode pedir minutos; a cadeia segue antes
+        raise_on_status=False
+    )
+    adapter_options = {
+        'pool_connections': DataProviderConfig.HTTP_POOL_HOSTS,
+        'pool_maxsize': pool_size,
+        'max_retries': retry
+    }
+    mode = cassette_mode()
+    if mode != MODE_OFF:
+        adapter = DeadlineCassetteAdapter(mode, get_cassette_store(), **adapter_options)
+    else:
+        adapter = DeadlineHTTPAdapter(**adapter_options)
+
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update(DEFAULT_HEADERS)
+    return session
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+def get_http_session() -> requests.Session:
+    """Retorna a sessão HTTP compartilhada do processo (criada na primeira chamada)"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = create_http_session()
+            logger.debug(f"Sessão HTTP criada (pool de {DataProviderConfig.HTTP_POOL_SIZE} conexões por host)")
+        return _session
+
+def create_async_http_client(max_connections: Optional[int] = None) -> 'httpx.AsyncClient':
+    """
+    Cria um cliente httpx assíncrono com pool de conexões keep-alive
+
+    O cliente pertence ao event loop em que é usado: crie um por lote de
+    requisições e feche com aclose() ao final. Criado dentro de um prazo
+    (backend.deadline), não repete conexões que falham: a retentativa repetiria o
+    timeout já limitado ao tempo restante.
+
+    Args:
+        max_connections: Conexões simultâneas no total (padrão ASYNC_MAX_CONCURRENCY)
+    """
+    if httpx is None:
+        raise RuntimeError("httpx não está instalado")
+
+    limits = httpx.Limits(
+        max_connections=max_connections or DataProviderConfig.ASYNC_MAX_CONCURRENCY,
+        max_keepalive_connections=DataProviderConfig.HTTP_POOL_SIZE
+    )
+    # httpx repete apenas falhas de conexão (equivalente ao read=0 da sessão síncrona)
+    retries = DataProviderConfig.HTTP_MAX_RETRIES if remaining() is None else 0
+    transport = httpx.AsyncHTTPTransport(limits=limits, retries=retries)
+
+    mode = cassette_mode()
+    if mode != MODE_OFF:
+        transport = CassetteTransport(mode, get_cassette_store(), transport)
+
+    return httpx.AsyncClient(
+        headers=DEFAULT_HEADERS,
+        transport=transport,
+        timeout=DataProviderConfig.DEFAULT_TIMEOUT
+    )
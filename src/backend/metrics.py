@@ -0,0 +1,90 @@
+"""
+Métricas Prometheus da cadeia de provedores de dados
+Registradas no registro padrão do processo: o bot as expõe junto com as demais
+métricas (start_http_server em app.py) e a API em GET /metrics.
+
+- provider_requests_total / provider_request_duration_seconds: cada requisição HTTP
+  dos provedores REST, por provedor, variante de endpoint e resultado
+- provider_attempts_total / provider_attempt_duration_seconds: cada consulta do
+  gerenciador a um provedor (qualquer tipo), por resultado: success, empty,
+  not_found, skipped (sem prazo ou cota para a requisição) ou a classe da falha
+  (timeout, http_error, parse_error; failure se não classificada)
+- data_fetch_depth / data_fetch_source_total: até onde a cadeia de fallback desceu
+  em cada busca e quem atendeu (incluindo histórico antigo e create_fallback_data)
+"""
+
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit, parse_qsl
+
+from prometheus_client import Counter, Histogram
+
+from .cassette import SECRET_PARAMS
+
+# Resultados de uma requisição HTTP (provider_requests_total)
+REQUEST_SUCCESS = 'success'
+REQUEST_EMPTY = 'empty'            # 404 ou JSON válido sem dados
+REQUEST_TIMEOUT = 'timeout'
+REQUEST_HTTP_ERROR = 'http_error'  # Status diferente de 200/404 ou falha de conexão
+REQUEST_PARSE_ERROR = 'parse_error'
+
+# Origens que não são provedores da cadeia (data_fetch_source_total)
+SOURCE_NONE = 'none'                    # Todos os provedores falharam
+SOURCE_FALLBACK_DATA = 'fallback_data'  # create_fallback_data
+SOURCE_STALE = 'stale'                  # Último histórico real (stale-if-error)
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 30.0)
+DEPTH_BUCKETS = (1, 2, 3, 4, 5, 6, 7, 8, 9, 10)
+
+PROVIDER_REQUESTS = Counter(
+    'provider_requests_total', 'Requisições HTTP aos provedores REST',
+    ['provider', 'variant', 'outcome']
+)
+PROVIDER_REQUEST_DURATION = Histogram(
+    'provider_request_duration_seconds', 'Duração das requisições HTTP aos provedores REST',
+    ['provider', 'variant', 'outcome'], buckets=LATENCY_BUCKETS
+)
+PROVIDER_ATTEMPTS = Counter(
+    'provider_attempts_total', 'Consultas do gerenciador a cada provedor',
+    ['provider', 'outcome']
+)
+PROVIDER_ATTEMPT_DURATION = Histogram(
+    'provider_attempt_duration_seconds', 'Duração das consultas do gerenciador a cada provedor',
+    ['provider', 'outcome'], buckets=LATENCY_BUCKETS
+)
+FETCH_DEPTH = Histogram(
+    'data_fetch_depth', 'Posição na cadeia de fallback do provedor que atendeu a busca (n+1 se nenhum)',
+    buckets=DEPTH_BUCKETS
+)
+FETCH_SOURCE = Counter(
+    'data_fetch_source_total', 'Origem dos dados de cada busca de histórico',
+    ['source']
+)
+
+def endpoint_variant(url: str, params: Optional[Dict[str, Any]], symbol: str) -> str:
+    """
+    Rótulo estável da variante de endpoint: caminho com o símbolo substituído e
+    nomes dos parâmetros (sem valores nem chaves de API), ex: /api/quote/{symbol}?interval,range
+    """
+    parts = urlsplit(url)
+    names = {name for name, _ in parse_qsl(parts.query, keep_blank_values=True)}
+    names.update(params or {})
+    names -= SECRET_PARAMS
+
+    path = parts.path.replace(symbol, '{symbol}') if symbol else parts.path
+    return f"{path}?{','.join(sorted(names))}" if names else path
+
+def observe_request(provider: str, variant: str, outcome: str, duration: float):
+    """Registra uma requisição HTTP de um provedor REST"""
+    PROVIDER_REQUESTS.labels(provider, variant, outcome).inc()
+    PROVIDER_REQUEST_DURATION.labels(provider, variant, outcome).observe(duration)
+
+def observe_attempt(provider: str, outcome: str, duration: float):
+    """Registra uma consulta do gerenciador a um provedor"""
+    PROVIDER_ATTEMPTS.labels(provider, outcome).inc()
+    PROVIDER_ATTEMPT_DURATION.labels(provider, outcome).observe(duration)
+
+def observe_fetch(source: str, depth: Optional[int] = None):
+    """Registra quem atendeu uma busca e, para a cadeia de provedores, a profundidade alcançada"""
+    FETCH_SOURCE.labels(source).inc()
+    if depth is not None:
+        FETCH_DEPTH.observe(depth)
@@ -12,7 +12,7 @@ from pathlib import Path
 root_dir = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(root_dir))
 
-from backend.database import SessionLocal, Acao, Carteira
+from backend.database import SessionLocal, Acao, Carteira, init_db
 from backend.utils import normalize_stock_code, validate_stock_code
 import logging
 
@@ -199,6 +199,8 @@ def main():
     logger.info("🚀 Iniciando migração de códigos de ações...")
     
     try:
+        init_db()
+        
         # Executa as migrações
         migrate_acoes()
         migrate_carteira()
@@ -1,6 +1,6 @@
 import os
-import requests
 import logging
+from backend.http_client import get_http_session
 
 def send_email_notification(subject: str, body: str, to_email: str = None) -> bool:
     """
@@ -46,8 +46,8 @@ def send_email_notification(subject: str, body: str, to_email: str = None) -> bo
             "html": body
         }
         
-        # Envia email via API
-        response = requests.post(url, headers=headers, json=data)
+        # Envia email via API (conexão reaproveitada do pool compartilhado; POST não é repetido)
+        response = get_http_session().post(url, headers=headers, json=data, timeout=30)
         
         if response.status_code == 200:
             logging.info(f"Email enviado com sucesso para {email_to}")
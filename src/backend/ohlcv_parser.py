@@ -0,0 +1,239 @@
+"""
+Conversão vetorizada de respostas JSON em DataFrames OHLCV
+Usada pelos provedores REST: cada provedor descreve o esquema do seu payload
+(nome dos campos) e a conversão é feita por coluna com numpy/pandas, sem
+montar um dicionário por candle. normalize_ohlcv define o layout canônico em
+que o gerenciador entrega qualquer histórico, venha de onde vier.
+"""
+
+import pandas as pd
+import numpy as np
+from datetime import datetime, timedelta
+from typing import Optional, Dict, List, Any, Tuple
+
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close']
+
+# Fuso da B3: índices com fuso são convertidos para a data local do pregão
+MARKET_TIMEZONE = 'America/Sao_Paulo'
+
+# Esquema padrão: coluna OHLCV -> campo no JSON (BrAPI e Tiingo usam este formato)
+DEFAULT_SCHEMA = {
+    'Open': 'open',
+    'High': 'high',
+    'Low': 'low',
+    'Close': 'close',
+    'Volume': 'volume',
+    'Date': 'date'
+}
+
+# Abaixo deste número de candles o laço simples é mais rápido que from_records + conversão
+# por coluna (o custo fixo do pandas domina); ver src/test/ohlcv_parser_benchmark.py
+SMALL_PAYLOAD_BARS = 64
+
+def records_to_ohlcv(records: List[Dict[str, Any]], schema: Optional[Dict[str, str]] = None,
+                     date_unit: str = 's', default_date: Optional[datetime] = None) -> Optional[pd.DataFrame]:
+    """
+    Converte uma lista de candles (dicionários) em OHLCV indexado por data
+
+    Payloads grandes são lidos em uma passada (DataFrame.from_records) e cada coluna é
+    convertida de uma vez; até SMALL_PAYLOAD_BARS candles as colunas são montadas em um
+    laço, que nesse tamanho custa menos. Datas numéricas são interpretadas como epoch em
+    date_unit; se o campo de data não existir, usa default_date (ou agora). Linhas com
+    preço inválido ou com abertura/fechamento zerados são descartadas; volume ausente vira 0.
+
+    Returns:
+        DataFrame ordenado por data ou None se nenhum registro for utilizável
+    """
+    if not records:
+        return None
+
+    schema = schema or DEFAULT_SCHEMA
+    if len(records) <= SMALL_PAYLOAD_BARS:
+        return _small_records_to_ohlcv(records, schema, date_unit, default_date)
+
+    raw = pd.DataFrame.from_records(records)
+    if raw.empty:
+        return None
+
+    columns = {}
+    for column in ['Open', 'High', 'Low', 'Close']:
+        source = schema[column]
+        columns[column] = pd.to_numeric(raw[source], errors='coerce').astype('float64') if source in raw else np.nan
+
+    volume_source = schema['Volume']
+    if volume_source in raw:
+        volume = pd.to_numeric(raw[volume_source], errors='coerce').fillna(0)
+    else:
+        volume = 0
+    columns['Volume'] = volume
+
+    date_source = schema['Date']
+    if date_source in raw:
+        columns['Date'] = _to_dates(raw[date_source], date_unit)
+    else:
+        columns['Date'] = pd.Timestamp((default_date or datetime.now()).strftime('%Y-%m-%d'))
+
+    return _assemble_ohlcv(pd.DataFrame(columns, index=raw.index))
+
+def _small_records_to_ohlcv(records: List[Dict[str, Any]], schema: Dict[str, str], date_unit: str,
+                            default_date: Optional[datetime]) -> Optional[pd.DataFrame]:
+    """Mesma conversão de records_to_ohlcv, candle a candle, para payloads pequenos"""
+    sources = [schema[column] for column in PRICE_COLUMNS]
+    volume_source = schema['Volume']
+    date_source = schema['Date']
+    has_dates = any(date_source in item for item in records)
+
+    prices = {column: [] for column in PRICE_COLUMNS}
+    volumes = []
+    dates = []
+    for item in records:
+        for column, source in zip(PRICE_COLUMNS, sources):
+            try:
+                prices[column].append(float(item.get(source)))
+            except (ValueError, TypeError):
+                prices[column].append(np.nan)
+        try:
+            volume = float(item.get(volume_source))
+        except (ValueError, TypeError):
+            volume = 0.0
+        volumes.append(0.0 if np.isnan(volume) else volume)
+        if has_dates:
+            dates.append(item.get(date_source))
+
+    columns = dict(prices)
+    columns['Volume'] = volumes
+    if has_dates:
+        columns['Date'] = _to_dates(pd.Series(dates), date_unit)
+    else:
+        columns['Date'] = pd.Timestamp((default_date or datetime.now()).strftime('%Y-%m-%d'))
+
+    return _assemble_ohlcv(pd.DataFrame(columns))
+
+def _to_dates(dates: pd.Series, date_unit: str) -> pd.Series:
+    """Datas numéricas como epoch em date_unit; as demais (ISO) pelo parser do pandas"""
+    if pd.api.types.is_numeric_dtype(dates):
+        return pd.to_datetime(dates, unit=date_unit, errors='coerce')
+    return pd.to_datetime(dates, errors='coerce')
+
+def _assemble_ohlcv(data: pd.DataFrame) -> Optional[pd.DataFrame]:
+    """Descarta linhas inválidas e indexa por data (etapa comum aos dois caminhos)"""
+    data = data.dropna(subset=['Open', 'High', 'Low', 'Close', 'Date'])
+    data = data[(data['Close'] > 0) & (data['Open'] > 0)]
+
+    if data.empty:
+        return None
+
+    data['Volume'] = data['Volume'].astype('int64')
+    data = data.set_index('Date').sort_index()
+    return data[OHLCV_COLUMNS]
+
+def is_canonical_ohlcv(data: pd.DataFrame) -> bool:
+    """Verifica se o DataFrame já está no layout de normalize_ohlcv (pode ser reutilizado sem cópia)"""
+    index = data.index
+    if (list(data.columns) != OHLCV_COLUMNS or not isinstance(index, pd.DatetimeIndex) or index.tz is not None
+            or not index.is_monotonic_increasing or not index.is_unique):
+        return False
+    if any(data[column].dtype != np.float64 for column in PRICE_COLUMNS) or data['Volume'].dtype != np.int64:
+        return False
+
+    prices = data[PRICE_COLUMNS].to_numpy()
+    return bool((index == index.normalize()).all() and (prices > 0).all())
+
+def normalize_ohlcv(data: Optional[pd.DataFrame], timezone: str = MARKET_TIMEZONE) -> Optional[pd.DataFrame]:
+    """
+    Converte o histórico de qualquer provedor para o layout canônico
+
+    Índice DatetimeIndex diário sem fuso (data do pregão em timezone; datas sem horário
+    mantêm o dia do calendário em que vieram), ordenado e sem
+    datas repetidas (vale a última); colunas exatamente OHLCV_COLUMNS com preços
+    float64 e volume int64 (ausente vira 0). Colunas extras (Dividends, Stock Splits,
+    Adj Close...) são descartadas e barras com preço ausente ou não positivo, removidas.
+    Nomes de coluna são aceitos sem diferenciar maiúsculas; um índice que não seja de
+    datas usa a coluna Date/date, se existir.
+
+    Returns:
+        DataFrame canônico (o próprio objeto se já estiver no layout) ou None se
+        nenhuma barra for utilizável
+    """
+    if data is None or data.empty:
+        return None
+    if is_canonical_ohlcv(data):
+        return data
+
+    # Renomeações podem ter gerado colunas repetidas (ex: Close e Adj. Close): vale a última
+    frame = data.loc[:, ~data.columns.duplicated(keep='last')]
+    columns = {str(column).strip().lower(): column for column in frame.columns}
+    if any(column.lower() not in columns for column in PRICE_COLUMNS):
+        return None
+
+    index = frame.index
+    if not isinstance(index, pd.DatetimeIndex) and 'date' in columns:
+        index = frame[columns['date']]
+    index = pd.DatetimeIndex(pd.to_datetime(index, errors='coerce'))
+    if index.tz is not None:
+        # Datas sem horário (meia-noite no próprio fuso, ex: Tiingo em UTC) mantêm o dia do
+        # calendário; só horários intradiários são convertidos para o dia do pregão em timezone
+        if (index == index.normalize()).all():
+            index = index.tz_localize(None)
+        else:
+            index = index.tz_convert(timezone).tz_localize(None)
+
+    canonical = {
+        column: pd.to_numeric(frame[columns[column.lower()]], errors='coerce').to_numpy(dtype='float64')
+        for column in PRICE_COLUMNS
+    }
+    if 'volume' in columns:
+        volume = pd.to_numeric(frame[columns['volume']], errors='coerce').fillna(0).to_numpy()
+    else:
+        volume = np.zeros(len(frame))
+    canonical['Volume'] = volume
+
+    result = pd.DataFrame(canonical, index=index.normalize())
+    prices = result[PRICE_COLUMNS]
+    result = result[(prices > 0).all(axis=1).to_numpy() & result.index.notna()]
+    if result.empty:
+        return None
+
+    result['Volume'] = result['Volume'].round().astype('int64')
+    result = result[~result.index.duplicated(keep='last')].sort_index()
+    result.index.name = None
+    return result
+
+def recent_business_days(days: int, end: Optional[datetime] = None) -> pd.DatetimeIndex:
+    """Últimos 'days' dias úteis (segunda a sexta) até end (padrão: agora)"""
+    end = end or datetime.now()
+    dates = pd.date_range(start=end - timedelta(days=days + 10), end=end, freq='D')
+    dates = dates[dates.weekday < 5]
+    return dates[-days:]
+
+def synthetic_history(current_price: float, dates: pd.DatetimeIndex, daily_change: float,
+                      high_range: Tuple[float, float], low_range: Tuple[float, float],
+                      volume_range: Tuple[int, int],
+                      rng: Optional[np.random.Generator] = None) -> pd.DataFrame:
+    """
+    Gera OHLCV retroativo a partir do preço atual, com todas as barras calculadas de uma vez
+
+    O fechamento anda para trás a partir de current_price com variação uniforme de
+    ±daily_change por dia; abertura, máxima e mínima são faixas em torno do fechamento
+    e a ordem OHLC é garantida.
+    """
+    rng = rng or np.random.default_rng()
+    count = len(dates)
+
+    # Caminho para trás: o índice 0 é o dia mais recente, depois inverte para ordem cronológica
+    changes = 1 + rng.uniform(-daily_change, daily_change, count)
+    close = (current_price * np.cumprod(changes))[::-1]
+
+    open_ = close * rng.uniform(0.998, 1.002, count)
+    high = np.maximum.reduce([close * rng.uniform(*high_range, count), open_, close])
+    low = np.minimum.reduce([close * rng.uniform(*low_range, count), open_, close])
+    volume = rng.integers(volume_range[0], volume_range[1], count, endpoint=True)
+
+    return pd.DataFrame({
+        'Open': np.round(open_, 2),
+        'High': np.round(high, 2),
+        'Low': np.round(low, 2),
+        'Close': np.round(close, 2),
+        'Volume': volume
+    }, index=dates)
@@ -0,0 +1,176 @@
+"""
+Armazenamento local de histórico de preços (OHLCV)
+Mantém os candles já obtidos dos provedores em SQLite para que o gerenciador
+precise buscar apenas as barras mais recentes a cada ciclo
+"""
+
+import os
+import sqlite3
+import threading
+import logging
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Optional, Dict
+
+import pandas as pd
+
+from .ohlcv_parser import OHLCV_COLUMNS, normalize_ohlcv
+
+logger = logging.getLogger(__name__)
+
+class PriceStore:
+    """Armazena candles diários por ação em uma tabela SQLite compartilhada"""
+
+    def __init__(self, db_path: str = 'config/price_history.db'):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._init_schema()
+
+    @contextmanager
+    def _connect(self):
+        """Abre uma conexão nova por operação (sqlite3 não compartilha conexões entre threads)"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _init_schema(self):
+        """Cria as tabelas de candles e de metadados por ação"""
+        with self._lock, self._connect() as conn:
+            # WAL permite que bot e API leiam enquanto o outro escreve
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS ohlcv (
+                    symbol TEXT NOT NULL,
+                    date TEXT NOT NULL,
+                    open REAL NOT NULL,
+                    high REAL NOT NULL,
+                    low REAL NOT NULL,
+                    close REAL NOT NULL,
+                    volume INTEGER NOT NULL,
+                    PRIMARY KEY (symbol, date)
+                ) WITHOUT ROWID
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS symbols (
+                    symbol TEXT PRIMARY KEY,
+                    provider TEXT,
+                    history_days INTEGER NOT NULL DEFAULT 0,
+                    refreshed_at TEXT
+                )
+            """)
+
+    @staticmethod
+    def _prepare_frame(data: pd.DataFrame) -> pd.DataFrame:
+        """Converte o DataFrame de um provedor para o layout armazenado (um candle por dia)"""
+        frame = normalize_ohlcv(data)
+        return frame if frame is not None else pd.DataFrame(columns=OHLCV_COLUMNS)
+
+    def get_metadata(self, symbol: str) -> Optional[Dict]:
+        """Retorna metadados do histórico armazenado de uma ação"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT provider, history_days, refreshed_at FROM symbols WHERE symbol = ?",
+                (symbol,)
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        return {
+            'provider': row[0],
+            'history_days': row[1],
+            'refreshed_at': datetime.fromisoformat(row[2]) if row[2] else None
+        }
+
+    def load(self, symbol: str, days: Optional[int] = None) -> Optional[pd.DataFrame]:
+        """
+        Carrega o histórico armazenado de uma ação
+
+        Args:
+            symbol: Código da ação (sem .SA)
+            days: Quantidade de candles mais recentes (None para todos)
+
+        Returns:
+            DataFrame OHLCV em ordem cronológica ou None se não houver dados
+        """
+        query = "SELECT date, open, high, low, close, volume FROM ohlcv WHERE symbol = ? ORDER BY date DESC"
+        params = [symbol]
+        if days is not None:
+            query += " LIMIT ?"
+            params.append(int(days))
+
+        with self._connect() as conn:
+            rows = conn.execute(query, params).fetchall()
+
+        if not rows:
+            return None
+
+        rows.reverse()
+        data = pd.DataFrame(rows, columns=['Date'] + OHLCV_COLUMNS)
+        data.index = pd.to_datetime(data.pop('Date'))
+        data.index.name = None
+        return data
+
+    def last_date(self, symbol: str) -> Optional[pd.Timestamp]:
+        """Retorna a data do candle mais recente armazenado"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT MAX(date) FROM ohlcv WHERE symbol = ?", (symbol,)).fetchone()
+        return pd.Timestamp(row[0]) if row and row[0] else None
+
+    def upsert(self, symbol: str, data: pd.DataFrame, provider: Optional[str] = None,
+               history_days: int = 0) -> int:
+        """
+        Grava candles de uma ação, substituindo datas já existentes
+
+        Args:
+            symbol: Código da ação (sem .SA)
+            data: DataFrame OHLCV retornado por um provedor
+            provider: Nome do provedor que forneceu os dados
+            history_days: Janela de histórico coberta por esta gravação
+
+        Returns:
+            Quantidade de candles gravados
+        """
+        frame = self._prepare_frame(data)
+        rows = [
+            (symbol, date.strftime('%Y-%m-%d'), float(o), float(h), float(l), float(c), int(v))
+            for date, o, h, l, c, v in zip(
+                frame.index, frame['Open'], frame['High'], frame['Low'],
+                frame['Close'], frame['Volume'].fillna(0)
+            )
+        ]
+
+        with self._lock, self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO ohlcv (symbol, date, open, high, low, close, volume) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            conn.execute("""
+                INSERT INTO symbols (symbol, provider, history_days, refreshed_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT(symbol) DO UPDATE SET
+                    provider = COALESCE(excluded.provider, symbols.provider),
+                    history_days = MAX(symbols.history_days, excluded.history_days),
+                    refreshed_at = excluded.refreshed_at
+            """, (symbol, provider, int(history_days), datetime.now().isoformat()))
+
+        return len(rows)
+
+    def get_statistics(self) -> Dict:
+        """Retorna estatísticas gerais do armazenamento"""
+        with self._connect() as conn:
+            symbols = conn.execute("SELECT COUNT(*) FROM symbols").fetchone()[0]
+            bars = conn.execute("SELECT COUNT(*) FROM ohlcv").fetchone()[0]
+
+        return {
+            'path': self.db_path,
+            'symbols': symbols,
+            'bars': bars
+        }
@@ -0,0 +1,338 @@
+"""
+Acompanhamento da saúde dos provedores de dados
+Estatísticas de uso em janela deslizante, circuit breakers, cache negativo e
+memória das variantes de endpoint usados pela cadeia de fallback
+"""
+
+import threading
+import time
+from collections import deque, OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Iterator, Optional, Dict, List, Tuple
+
+import numpy as np
+
+# Resultados possíveis de uma tentativa em um provedor
+OUTCOME_SUCCESS = 'success'
+OUTCOME_EMPTY = 'empty'
+OUTCOME_FAILURE = 'failure'
+OUTCOME_NOT_FOUND = 'not_found'  # Resposta conclusiva: o provedor não tem o símbolo
+OUTCOME_SKIPPED = 'skipped'      # Sem orçamento (prazo, rate limiter ou cota): o provedor não foi consultado
+
+# Resultados que indicam um provedor saudável (respondeu de forma conclusiva)
+HEALTHY_OUTCOMES = (OUTCOME_SUCCESS, OUTCOME_NOT_FOUND)
+
+class ProviderStats:
+    """Contadores e latências de um provedor (thread-safe)"""
+
+    def __init__(self, window: int = 50):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.successes = 0
+        self.failures = 0
+        self.empty_results = 0
+        self.not_found = 0
+        self.skipped = 0
+        self.last_used: Optional[datetime] = None
+        self.last_success: Optional[datetime] = None
+        # Últimas tentativas: (resultado, latência em segundos)
+        self._recent = deque(maxlen=window)
+
+    def record(self, outcome: str, latency: float):
+        """Registra o resultado de uma tentativa (puladas não entram na janela nem nas taxas)"""
+        with self._lock:
+            if outcome == OUTCOME_SKIPPED:
+                self.skipped += 1
+                return
+
+            self.requests += 1
+            self.last_used = datetime.now()
+
+            if outcome == OUTCOME_SUCCESS:
+                self.successes += 1
+                self.last_success = self.last_used
+            elif outcome == OUTCOME_EMPTY:
+                self.empty_results += 1
+            elif outcome == OUTCOME_NOT_FOUND:
+                self.not_found += 1
+            else:
+                self.failures += 1
+
+            self._recent.append((outcome, latency))
+
+    @property
+    def window_size(self) -> int:
+        """Quantidade de tentativas na janela deslizante"""
+        return len(self._recent)
+
+    def success_rate(self) -> Optional[float]:
+        """Taxa de respostas saudáveis na janela deslizante (None sem amostras)"""
+        with self._lock:
+            if not self._recent:
+                return None
+            return sum(1 for outcome, _ in self._recent if outcome in HEALTHY_OUTCOMES) / len(self._recent)
+
+    def latency_percentile(self, percentile: float) -> Optional[float]:
+        """Percentil da latência na janela deslizante (None sem amostras)"""
+        with self._lock:
+            if not self._recent:
+                return None
+            return float(np.percentile([latency for _, latency in self._recent], percentile))
+
+    def score(self, failure_penalty: float) -> float:
+        """
+        Custo esperado de consultar o provedor (menor é melhor): latência p95
+        somada a uma penalidade proporcional à taxa de falhas recente
+        """
+        success_rate = self.success_rate()
+        p95 = self.latency_percentile(95)
+        if success_rate is None or p95 is None:
+            return 0.0
+        return p95 + (1 - success_rate) * failure_penalty
+
+    def to_dict(self) -> Dict:
+        """Resumo serializável das estatísticas"""
+        success_rate = self.success_rate()
+        p50 = self.latency_percentile(50)
+        p95 = self.latency_percentile(95)
+
+        return {
+            'requests': self.requests,
+            'successes': self.successes,
+            'failures': self.failures,
+            'empty_results': self.empty_results,
+            'not_found': self.not_found,
+            'skipped': self.skipped,
+            'last_used': self.last_used.isoformat() if self.last_used else None,
+            'last_success': self.last_success.isoformat() if self.last_success else None,
+            'success_rate': round(success_rate, 3) if success_rate is not None else None,
+            'latency_p50': round(p50, 3) if p50 is not None else None,
+            'latency_p95': round(p95, 3) if p95 is not None else None,
+            'window_size': self.window_size
+        }
+
+class AttemptBudget:
+    """Marca de uma tentativa do gerenciador: o provedor deixou de fazer alguma requisição por falta de orçamento"""
+
+    def __init__(self):
+        self.skipped = False
+
+_attempt: ContextVar[Optional[AttemptBudget]] = ContextVar('provider_attempt', default=None)
+
+@contextmanager
+def attempt_scope() -> Iterator[AttemptBudget]:
+    """
+    Acompanha uma tentativa em um provedor; o objeto é compartilhado com cópias do
+    contexto (asyncio.to_thread, executores), então a marca feita lá é vista aqui
+    """
+    budget = AttemptBudget()
+    token = _attempt.set(budget)
+    try:
+        yield budget
+    finally:
+        _attempt.reset(token)
+
+def note_budget_skip():
+    """Registra na tentativa atual que uma requisição não foi feita por falta de orçamento"""
+    budget = _attempt.get()
+    if budget is not None:
+        budget.skipped = True
+
+# Estados do circuit breaker
+CIRCUIT_CLOSED = 'closed'
+CIRCUIT_OPEN = 'open'
+CIRCUIT_HALF_OPEN = 'half_open'
+
+class CircuitBreaker:
+    """
+    Circuit breaker por provedor: após N falhas consecutivas o provedor é ignorado
+    durante o período de espera; depois uma única requisição de teste decide se o
+    circuito fecha novamente ou volta a abrir
+    """
+
+    def __init__(self, failure_threshold: int = 3, recovery_timeout: float = 300.0):
+        self._lock = threading.Lock()
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = CIRCUIT_CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.times_opened = 0
+        self._probe_in_flight = False
+
+    def allow_request(self) -> bool:
+        """Indica se o provedor pode ser consultado agora"""
+        with self._lock:
+            if self.state == CIRCUIT_CLOSED:
+                return True
+
+            if self.state == CIRCUIT_OPEN:
+                if time.monotonic() - self.opened_at < self.recovery_timeout:
+                    return False
+                # Espera terminou: libera uma requisição de teste
+                self.state = CIRCUIT_HALF_OPEN
+                self._probe_in_flight = False
+
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def is_open(self) -> bool:
+        """Indica se o circuito está aberto e ainda em espera (sem liberar a requisição de teste)"""
+        with self._lock:
+            return self.state == CIRCUIT_OPEN and time.monotonic() - self.opened_at < self.recovery_timeout
+
+    def record_success(self):
+        """Fecha o circuito após uma resposta bem-sucedida"""
+        with self._lock:
+            self.state = CIRCUIT_CLOSED
+            self.consecutive_failures = 0
+            self.opened_at = None
+            self._probe_in_flight = False
+
+    def release_probe(self):
+        """Devolve a requisição de teste que acabou não sendo feita (tentativa pulada)"""
+        with self._lock:
+            if self.state == CIRCUIT_HALF_OPEN:
+                self._probe_in_flight = False
+
+    def record_failure(self):
+        """Conta uma falha, abrindo o circuito no limite ou se o teste falhar"""
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == CIRCUIT_HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != CIRCUIT_OPEN:
+                    self.times_opened += 1
+                self.state = CIRCUIT_OPEN
+                self.opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+    def to_dict(self) -> Dict:
+        """Resumo serializável do estado do circuito"""
+        with self._lock:
+            retry_in = None
+            if self.state == CIRCUIT_OPEN:
+                retry_in = max(0.0, self.recovery_timeout - (time.monotonic() - self.opened_at))
+
+            return {
+                'state': self.state,
+                'consecutive_failures': self.consecutive_failures,
+                'failure_threshold': self.failure_threshold,
+                'times_opened': self.times_opened,
+                'retry_in_seconds': round(retry_in, 1) if retry_in is not None else None
+            }
+
+class NegativeCache:
+    """
+    Pares (provedor, símbolo) que o provedor respondeu não conhecer (404 ou payload
+    vazio), com expiração: a cadeia de fallback pula esses provedores até o TTL vencer
+    """
+
+    def __init__(self, ttl: float = 21600.0):
+        self._lock = threading.Lock()
+        self.ttl = ttl
+        self.hits = 0
+        self._entries: Dict[Tuple[str, str], float] = {}
+
+    def add(self, provider_name: str, symbol: str):
+        """Registra que o provedor não tem o símbolo"""
+        with self._lock:
+            self._entries[(provider_name, symbol)] = time.monotonic() + self.ttl
+
+    def contains(self, provider_name: str, symbol: str) -> bool:
+        """Indica se o par está no cache (entradas vencidas são removidas)"""
+        key = (provider_name, symbol)
+        with self._lock:
+            expires_at = self._entries.get(key)
+            if expires_at is None:
+                return False
+            if time.monotonic() >= expires_at:
+                del self._entries[key]
+                return False
+            self.hits += 1
+            return True
+
+    def discard(self, provider_name: str, symbol: str):
+        """Remove um par (ex: o provedor voltou a responder o símbolo)"""
+        with self._lock:
+            self._entries.pop((provider_name, symbol), None)
+
+    def count(self, provider_name: str) -> int:
+        """Quantidade de símbolos ativos no cache para um provedor"""
+        now = time.monotonic()
+        with self._lock:
+            return sum(1 for (name, _), expires_at in self._entries.items()
+                       if name == provider_name and expires_at > now)
+
+    def to_dict(self) -> Dict:
+        """Resumo serializável do cache"""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                'entries': sum(1 for expires_at in self._entries.values() if expires_at > now),
+                'hits': self.hits,
+                'ttl_seconds': self.ttl
+            }
+
+class EndpointVariantMemory:
+    """
+    Lembra qual variante de endpoint/formato de símbolo funcionou por símbolo
+
+    A variante que respondeu por último é tentada primeiro; as demais seguem
+    ordenadas pelas falhas recentes do símbolo (variantes que falham sempre vão
+    para o fim) e, em empate, pela ordem original do provedor. Guarda no máximo
+    max_symbols símbolos (os usados há mais tempo são esquecidos).
+    """
+
+    def __init__(self, max_symbols: int = 1000):
+        self._lock = threading.Lock()
+        self.max_symbols = max(1, max_symbols)
+        # Símbolo -> (variante preferida, falhas por variante)
+        self._symbols: 'OrderedDict[str, Tuple[Optional[int], Dict[int, int]]]' = OrderedDict()
+
+    def _entry(self, symbol: str) -> Tuple[Optional[int], Dict[int, int]]:
+        entry = self._symbols.get(symbol)
+        if entry is None:
+            entry = self._symbols[symbol] = (None, {})
+            while len(self._symbols) > self.max_symbols:
+                self._symbols.popitem(last=False)
+        self._symbols.move_to_end(symbol)
+        return entry
+
+    def order(self, symbol: str, count: int) -> List[int]:
+        """Índices das variantes na ordem em que devem ser tentadas"""
+        with self._lock:
+            preferred, failures = self._symbols.get(symbol, (None, {}))
+            ranked = sorted(range(count), key=lambda i: (i != preferred, failures.get(i, 0), i))
+        return ranked
+
+    def record_success(self, symbol: str, variant: int):
+        """Fixa a variante como preferida do símbolo e zera suas falhas"""
+        with self._lock:
+            _, failures = self._entry(symbol)
+            failures.pop(variant, None)
+            self._symbols[symbol] = (variant, failures)
+
+    def record_failure(self, symbol: str, variant: int):
+        """Conta uma falha da variante no símbolo; se era a preferida, deixa de ser"""
+        with self._lock:
+            preferred, failures = self._entry(symbol)
+            failures[variant] = failures.get(variant, 0) + 1
+            self._symbols[symbol] = (None if preferred == variant else preferred, failures)
+
+    def to_dict(self) -> Dict:
+        """Resumo serializável da memória"""
+        with self._lock:
+            totals: Dict[int, int] = {}
+            for _, failures in self._symbols.values():
+                for variant, count in failures.items():
+                    totals[variant] = totals.get(variant, 0) + count
+            return {
+                'remembered_symbols': sum(1 for preferred, _ in self._symbols.values() if preferred is not None),
+                'tracked_symbols': len(self._symbols),
+                'max_symbols': self.max_symbols,
+                'variant_failures': {str(variant): failures for variant, failures in sorted(totals.items())}
+            }
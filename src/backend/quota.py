@@ -0,0 +1,200 @@
+"""
+Planejamento de cota diária dos provedores com limite de requisições por dia
+Persiste o consumo em SQLite (sobrevive a reinícios e é compartilhado entre bot e API)
+e reserva orçamento para os ciclos horários restantes do pregão. A cota é descontada
+por requisição real ao provedor: o gerenciador define a cota e a prioridade da
+consulta em uma ContextVar (quota_scope) e cada provedor chama charge_request antes
+de enviar uma requisição.
+"""
+
+import os
+import sqlite3
+import threading
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Iterator, Optional, Dict, Tuple
+
+from .config import DataProviderConfig
+
+logger = logging.getLogger(__name__)
+
+# Prioridades de consulta
+PRIORITY_HIGH = 'high'  # Posições em carteira e consultas on-demand
+PRIORITY_LOW = 'low'    # Ações apenas monitoradas nos ciclos agendados
+
+class QuotaPlanner:
+    """Contabiliza o uso diário por provedor e decide se uma requisição cabe no orçamento"""
+
+    def __init__(self, db_path: str = 'config/provider_quota.db'):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS quota_usage (
+                    day TEXT NOT NULL,
+                    hour INTEGER NOT NULL,
+                    provider TEXT NOT NULL,
+                    used INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (day, hour, provider)
+                )
+            """)
+
+    @contextmanager
+    def _connect(self):
+        """Abre uma conexão nova por operação"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def remaining_cycles(now: Optional[datetime] = None) -> int:
+        """Quantidade de ciclos horários restantes no pregão, incluindo o atual"""
+        now = now or datetime.now()
+        open_hour = DataProviderConfig.MARKET_OPEN_HOUR
+        close_hour = DataProviderConfig.MARKET_CLOSE_HOUR
+
+        if now.hour < open_hour:
+            return close_hour - open_hour + 1
+        return max(1, close_hour - now.hour + 1)
+
+    def _usage(self, provider: str, now: datetime) -> Dict[str, int]:
+        """Retorna o uso do dia e da hora atual de um provedor"""
+        day = now.strftime('%Y-%m-%d')
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT COALESCE(SUM(used), 0), COALESCE(SUM(CASE WHEN hour = ? THEN used ELSE 0 END), 0) "
+                "FROM quota_usage WHERE day = ? AND provider = ?",
+                (now.hour, day, provider)
+            ).fetchone()
+        return {'day': row[0], 'hour': row[1]}
+
+    def allow(self, provider: str, priority: str = PRIORITY_HIGH) -> bool:
+        """
+        Verifica, sem descontar, se o provedor pode ser consultado
+
+        Requisições de alta prioridade só param quando a cota do dia acaba.
+        As de baixa prioridade ficam limitadas à fatia do ciclo atual:
+        (restante no início da hora) / (ciclos restantes no pregão).
+        """
+        limit = DataProviderConfig.get_daily_quota(provider)
+        if limit is None:
+            return True
+
+        now = datetime.now()
+        usage = self._usage(provider, now)
+        remaining = limit - usage['day']
+
+        if remaining <= 0:
+            logger.warning(f"📉 Cota diária de {provider} esgotada ({usage['day']}/{limit})")
+            return False
+
+        if priority == PRIORITY_HIGH:
+            return True
+
+        cycle_share = (remaining + usage['hour']) / self.remaining_cycles(now)
+        if usage['hour'] >= cycle_share:
+            logger.info(f"📉 {provider} reservado para ciclos futuros: {usage['hour']} usadas nesta hora, fatia de {cycle_share:.0f}")
+            return False
+
+        return True
+
+    def consume(self, provider: str, priority: str = PRIORITY_HIGH, amount: int = 1) -> bool:
+        """
+        Desconta requisições da cota do provedor se couberem no orçamento (as mesmas
+        regras de allow), em um único comando SQL: verificação e desconto são atômicos
+        mesmo com bot e API usando o mesmo banco
+
+        Returns:
+            True se as requisições foram descontadas (ou o provedor não tem cota)
+        """
+        limit = DataProviderConfig.get_daily_quota(provider)
+        if limit is None:
+            return True
+
+        now = datetime.now()
+        day = now.strftime('%Y-%m-%d')
+        # Baixa prioridade: uso da hora abaixo da fatia do ciclo (restante no início da hora / ciclos restantes)
+        high_priority = 1 if priority == PRIORITY_HIGH else 0
+        with self._lock, self._connect() as conn:
+            conn.execute("""
+                WITH usage AS (
+                    SELECT COALESCE(SUM(used), 0) AS day_used,
+                           COALESCE(SUM(CASE WHEN hour = ? THEN used ELSE 0 END), 0) AS hour_used
+                    FROM quota_usage WHERE day = ? AND provider = ?
+                )
+                INSERT INTO quota_usage (day, hour, provider, used)
+                SELECT ?, ?, ?, ? FROM usage
+                WHERE usage.day_used + ? <= ?
+                  AND (? OR usage.hour_used * ? < ? - usage.day_used + usage.hour_used)
+                ON CONFLICT(day, hour, provider) DO UPDATE SET used = used + excluded.used
+            """, (now.hour, day, provider,
+                  day, now.hour, provider, amount,
+                  amount, limit,
+                  high_priority, self.remaining_cycles(now), limit))
+            # rowcount não é preenchido em comandos iniciados por WITH
+            return conn.execute("SELECT changes()").fetchone()[0] > 0
+
+    def get_statistics(self) -> Dict[str, Dict]:
+        """Retorna o consumo do dia para todos os provedores com cota"""
+        now = datetime.now()
+        stats = {}
+
+        for provider in DataProviderConfig.DAILY_QUOTAS:
+            limit = DataProviderConfig.get_daily_quota(provider)
+            if limit is None:
+                continue
+
+            usage = self._usage(provider, now)
+            stats[provider] = {
+                'daily_limit': limit,
+                'used_today': usage['day'],
+                'used_this_hour': usage['hour'],
+                'remaining': max(0, limit - usage['day']),
+                'remaining_cycles': self.remaining_cycles(now)
+            }
+
+        return stats
+
+# Cota e prioridade da consulta em andamento (None = requisições não são descontadas)
+_quota_context: ContextVar[Optional[Tuple[QuotaPlanner, str]]] = ContextVar('provider_quota', default=None)
+
+@contextmanager
+def quota_scope(planner: Optional[QuotaPlanner], priority: str = PRIORITY_HIGH) -> Iterator[None]:
+    """Faz as requisições aos provedores dentro do bloco descontarem da cota de planner"""
+    if planner is None:
+        yield
+        return
+
+    token = _quota_context.set((planner, priority))
+    try:
+        yield
+    finally:
+        _quota_context.reset(token)
+
+def charge_request(provider: str) -> bool:
+    """
+    Desconta uma requisição ao provedor da cota da consulta atual
+
+    Returns:
+        False se a cota do provedor não comporta a requisição (ela não deve ser feita)
+    """
+    context = _quota_context.get()
+    if context is None or DataProviderConfig.get_daily_quota(provider) is None:
+        return True
+
+    planner, priority = context
+    if planner.consume(provider, priority):
+        return True
+    logger.info(f"📉 {provider}: cota diária esgotada ou reservada para ciclos futuros")
+    return False
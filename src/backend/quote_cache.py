@@ -0,0 +1,46 @@
+"""
+Cache em memória de cotações (último preço) com TTL curto
+Compartilhado por todos os chamadores do gerenciador: avaliação de carteira e
+checagem de stop loss leem o mesmo preço sem repetir requisições aos provedores
+"""
+
+import threading
+import time
+from typing import Optional, Dict, Tuple
+
+class QuoteCache:
+    """Último preço por símbolo, válido por ttl segundos"""
+
+    def __init__(self, ttl: float = 60.0):
+        self._lock = threading.Lock()
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[str, Tuple[float, float]] = {}
+
+    def get(self, symbol: str) -> Optional[float]:
+        """Preço em cache ou None se ausente/vencido (entradas vencidas são removidas)"""
+        with self._lock:
+            entry = self._entries.get(symbol)
+            if entry is None or time.monotonic() >= entry[1]:
+                self._entries.pop(symbol, None)
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[0]
+
+    def set(self, symbol: str, price: float):
+        """Armazena o preço do símbolo"""
+        with self._lock:
+            self._entries[symbol] = (price, time.monotonic() + self.ttl)
+
+    def to_dict(self) -> Dict:
+        """Resumo serializável do cache"""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                'entries': sum(1 for _, expires_at in self._entries.values() if expires_at > now),
+                'hits': self.hits,
+                'misses': self.misses,
+                'ttl_seconds': self.ttl
+            }
@@ -0,0 +1,97 @@
+"""
+Controle de taxa de requisições por provedor
+Token bucket compartilhado entre threads: só atrasa quando o orçamento acaba
+"""
+
+import asyncio
+import threading
+import time
+import logging
+from typing import Dict, Optional
+
+from .config import DataProviderConfig
+
+logger = logging.getLogger(__name__)
+
+class TokenBucket:
+    """Token bucket thread-safe (taxa em requisições/segundo com rajada máxima)"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        """Repõe tokens proporcionalmente ao tempo decorrido"""
+        self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def reserve(self) -> float:
+        """
+        Consome um token e retorna quantos segundos o chamador deve esperar.
+        O token é reservado mesmo quando o saldo fica negativo, garantindo a
+        ordem de chegada entre threads concorrentes.
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def _reserve_within(self, max_wait: Optional[float]) -> Optional[float]:
+        """Reserva um token se a espera couber em max_wait; senão devolve o token e retorna None"""
+        wait = self.reserve()
+        if max_wait is not None and wait > max_wait:
+            with self._lock:
+                self._tokens += 1
+            return None
+        return wait
+
+    def acquire(self, max_wait: Optional[float] = None) -> Optional[float]:
+        """
+        Bloqueia até haver orçamento disponível; retorna o tempo esperado
+
+        Com max_wait, não espera além disso: retorna None sem consumir o orçamento
+        """
+        wait = self._reserve_within(max_wait)
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, max_wait: Optional[float] = None) -> Optional[float]:
+        """Versão assíncrona de acquire: espera sem bloquear o event loop"""
+        wait = self._reserve_within(max_wait)
+        if wait:
+            await asyncio.sleep(wait)
+        return wait
+
+    def to_dict(self) -> Dict:
+        """Resumo serializável do limitador"""
+        with self._lock:
+            self._refill(time.monotonic())
+            return {
+                'rate_per_second': round(self.rate, 4),
+                'burst': self.burst,
+                'available_tokens': round(max(self._tokens, 0.0), 2)
+            }
+
+_limiters: Dict[str, TokenBucket] = {}
+_limiters_lock = threading.Lock()
+
+def get_rate_limiter(provider_name: str) -> TokenBucket:
+    """Retorna o limitador compartilhado de um provedor (criado na primeira chamada)"""
+    with _limiters_lock:
+        if provider_name not in _limiters:
+            rate, burst = DataProviderConfig.get_rate_limit(provider_name)
+            _limiters[provider_name] = TokenBucket(rate, burst)
+            logger.debug(f"Rate limiter de {provider_name}: {rate:.3f} req/s, rajada {burst}")
+        return _limiters[provider_name]
+
+def get_rate_limiter_statistics() -> Dict[str, Dict]:
+    """Retorna o estado de todos os limitadores já criados"""
+    with _limiters_lock:
+        limiters = dict(_limiters)
+    return {name: limiter.to_dict() for name, limiter in limiters.items()}
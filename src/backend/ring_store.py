@@ -0,0 +1,274 @@
+"""
+Histórico em memória por símbolo em buffers circulares numpy (colunar)
+O gerenciador de provedores alimenta o armazenamento com todo histórico real que
+obtém; durante um ciclo, novas consultas ao mesmo símbolo (análises, valuation,
+endpoints da API) são atendidas daqui, sem nova busca nem leitura do SQLite.
+
+Cada coluna (datas, Open, High, Low, Close, Volume) é um array de 2 x capacidade
+em que cada candle é gravado duas vezes (posição i e i + capacidade): acrescentar
+um candle é O(1) e os N candles mais recentes são sempre um trecho contíguo, ou
+seja, uma fatia sem cópia. A memória é limitada a capacidade x símbolos.
+"""
+
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .ohlcv_parser import OHLCV_COLUMNS, normalize_ohlcv
+from .stale_cache import ATTR_FETCHED_AT, mark_history
+
+# Colunas de cada buffer: nome -> dtype (datas em datetime64[ns])
+RING_COLUMNS = (
+    ('dates', 'datetime64[ns]'), ('open', 'float64'), ('high', 'float64'),
+    ('low', 'float64'), ('close', 'float64'), ('volume', 'int64')
+)
+
+# Estado de um buffer em um array int64: quantidade de candles, próxima posição de escrita, maior janela obtida
+STATE_COUNT, STATE_POSITION, STATE_HISTORY_DAYS = range(3)
+
+# Bytes por candle em cada cópia: data, 4 preços float64 e volume int64
+BAR_BYTES = len(RING_COLUMNS) * 8
+
+class HistoryWindow(NamedTuple):
+    """Últimos candles de um símbolo como visões somente leitura dos buffers (sem cópia)"""
+    dates: np.ndarray   # datetime64[ns]
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray  # int64
+    fetched_at: datetime
+    source: Optional[str]
+
+    def to_frame(self) -> pd.DataFrame:
+        """DataFrame OHLCV (cópia) com a procedência em attrs"""
+        data = pd.DataFrame({
+            'Open': self.open, 'High': self.high, 'Low': self.low,
+            'Close': self.close, 'Volume': self.volume
+        }, index=pd.DatetimeIndex(self.dates), columns=OHLCV_COLUMNS)
+        return mark_history(data, self.fetched_at, self.source, stale=False)
+
+class SymbolRing:
+    """
+    Buffer circular de candles diários de um símbolo
+
+    Colunas e estado podem vir de fora (ex: visões de um arquivo mapeado em
+    memória); por padrão são arrays próprios zerados.
+    """
+
+    # Procedência do último histórico incorporado
+    fetched_at: Optional[datetime] = None
+    source: Optional[str] = None
+
+    def __init__(self, capacity: int, columns: Optional[Dict[str, np.ndarray]] = None,
+                 state: Optional[np.ndarray] = None):
+        self.capacity = max(1, capacity)
+        if columns is None:
+            columns = {name: np.zeros(2 * self.capacity, dtype=dtype) for name, dtype in RING_COLUMNS}
+        self.columns = columns
+        self.state = state if state is not None else np.zeros(3, dtype=np.int64)
+
+    @property
+    def count(self) -> int:
+        return int(self.state[STATE_COUNT])
+
+    @property
+    def position(self) -> int:
+        """Próxima posição de escrita em [0, capacidade)"""
+        return int(self.state[STATE_POSITION])
+
+    @property
+    def history_days(self) -> int:
+        """Maior janela (candles) já obtida para o símbolo"""
+        return int(self.state[STATE_HISTORY_DAYS])
+
+    @property
+    def last_date(self) -> Optional[np.datetime64]:
+        if self.count == 0:
+            return None
+        return self.columns['dates'][self.position + self.capacity - 1]
+
+    @property
+    def first_date(self) -> Optional[np.datetime64]:
+        if self.count == 0:
+            return None
+        return self.columns['dates'][self.position + self.capacity - self.count]
+
+    def _write(self, slot: int, bar: tuple):
+        for (name, _), value in zip(RING_COLUMNS, bar):
+            column = self.columns[name]
+            column[slot] = value
+            column[slot + self.capacity] = value
+
+    def append(self, bar: tuple):
+        """Acrescenta um candle (data, open, high, low, close, volume), sobrescrevendo o mais antigo quando cheio"""
+        self._write(self.position, bar)
+        self.state[STATE_POSITION] = (self.position + 1) % self.capacity
+        self.state[STATE_COUNT] = min(self.count + 1, self.capacity)
+
+    def replace_last(self, bar: tuple):
+        """Substitui o candle mais recente (candle do dia em formação)"""
+        self._write((self.position - 1) % self.capacity, bar)
+
+    def load(self, data: pd.DataFrame):
+        """Substitui todo o conteúdo pelos últimos candles de um DataFrame canônico"""
+        tail = data.iloc[-self.capacity:]
+        n = len(tail)
+        values = {'dates': tail.index.to_numpy(dtype='datetime64[ns]')}
+        values.update({column.lower(): tail[column].to_numpy() for column in OHLCV_COLUMNS})
+        for name, _ in RING_COLUMNS:
+            column = self.columns[name]
+            column[:n] = values[name]
+            column[self.capacity:self.capacity + n] = values[name]
+        self.state[STATE_COUNT] = n
+        self.state[STATE_POSITION] = n % self.capacity
+
+    def merge(self, data: pd.DataFrame, days: int, fetched_at: datetime, source: Optional[str]) -> Tuple[int, bool]:
+        """
+        Incorpora um DataFrame canônico com os últimos `days` candles do símbolo
+
+        Candles posteriores ao último armazenado são acrescentados (e o do mesmo dia,
+        substituído); se o DataFrame recua além do início de um buffer que ainda não
+        está cheio, o buffer é recarregado a partir dele.
+
+        Returns:
+            (candles gravados, se o buffer foi recarregado)
+        """
+        dates = data.index.to_numpy(dtype='datetime64[ns]')
+        if self.count == 0 or (dates[0] < self.first_date and self.count < self.capacity):
+            self.load(data)
+            self.state[STATE_HISTORY_DAYS] = days
+            written, reloaded = min(len(data), self.capacity), True
+        else:
+            last_date = self.last_date
+            start = int(np.searchsorted(dates, last_date, side='left'))
+            values = data[OHLCV_COLUMNS].to_numpy(dtype=np.float64)[start:]
+            for date, (o, h, l, c, v) in zip(dates[start:], values):
+                bar = (date, o, h, l, c, int(v))
+                if date == last_date:
+                    self.replace_last(bar)
+                else:
+                    self.append(bar)
+            self.state[STATE_HISTORY_DAYS] = max(self.history_days, days)
+            written, reloaded = len(values), False
+
+        self.fetched_at = fetched_at
+        self.source = source
+        return written, reloaded
+
+    def window(self, days: int) -> Dict[str, np.ndarray]:
+        """Visões somente leitura dos últimos `days` candles (trecho contíguo do buffer)"""
+        n = min(max(days, 0), self.count)
+        end = self.position + self.capacity
+
+        views = {}
+        for name, _ in RING_COLUMNS:
+            view = self.columns[name][end - n:end]
+            view.flags.writeable = False
+            views[name] = view
+        return views
+
+    def nbytes(self) -> int:
+        return sum(column.nbytes for column in self.columns.values())
+
+class RingStore:
+    """
+    Buffers circulares por símbolo compartilhados pelo processo, LRU limitado a max_symbols
+
+    As visões devolvidas por window() acompanham o buffer: continuam válidas até a
+    próxima atualização do símbolo, que pode sobrescrever o candle mais antigo.
+    Quem precisa guardar os dados por mais tempo deve usar frame() (cópia).
+    """
+
+    def __init__(self, capacity: int = 512, max_symbols: int = 500):
+        self._lock = threading.Lock()
+        self.capacity = max(1, capacity)
+        self.max_symbols = max(1, max_symbols)
+        self.hits = 0
+        self.misses = 0
+        self.appended = 0
+        self.reloaded = 0
+        self._rings: 'OrderedDict[str, SymbolRing]' = OrderedDict()
+
+    def update(self, symbol: str, data: Optional[pd.DataFrame], source: Optional[str], days: int) -> int:
+        """
+        Incorpora o histórico obtido para os últimos `days` candles de um símbolo
+        (ver SymbolRing.merge); retorna quantos candles foram gravados
+        """
+        fetched_at = data.attrs.get(ATTR_FETCHED_AT) if data is not None else None
+        fetched_at = datetime.fromisoformat(fetched_at) if fetched_at else datetime.now()
+
+        data = normalize_ohlcv(data)
+        if data is None:
+            return 0
+
+        with self._lock:
+            ring = self._rings.get(symbol)
+            if ring is None:
+                ring = self._rings[symbol] = SymbolRing(self.capacity)
+                while len(self._rings) > self.max_symbols:
+                    self._rings.popitem(last=False)
+            self._rings.move_to_end(symbol)
+
+            written, reloaded = ring.merge(data, days, fetched_at, source)
+            if reloaded:
+                self.reloaded += 1
+            else:
+                self.appended += written
+            return written
+
+    def window(self, symbol: str, days: int, max_age: Optional[float] = None) -> Optional[HistoryWindow]:
+        """
+        Últimos `days` candles do símbolo sem cópia, ou None se o buffer não cobre a
+        janela pedida (nunca obtida ou maior que a capacidade) ou foi atualizado há
+        mais de max_age segundos
+        """
+        with self._lock:
+            return self._window(symbol, days, max_age)
+
+    def _window(self, symbol: str, days: int, max_age: Optional[float]) -> Optional[HistoryWindow]:
+        """window() com o lock já adquirido"""
+        ring = self._rings.get(symbol)
+        if (ring is None or days > ring.capacity or ring.history_days < days
+                or (max_age is not None and (datetime.now() - ring.fetched_at).total_seconds() > max_age)):
+            self.misses += 1
+            return None
+
+        self._rings.move_to_end(symbol)
+        self.hits += 1
+        views = ring.window(days)
+        return HistoryWindow(views['dates'], views['open'], views['high'], views['low'], views['close'],
+                             views['volume'], ring.fetched_at, ring.source)
+
+    def frame(self, symbol: str, days: int, max_age: Optional[float] = None) -> Optional[pd.DataFrame]:
+        """
+        Como window(), mas em um DataFrame OHLCV próprio do chamador (a cópia é feita
+        na mesma seção crítica da leitura, sem atualização do símbolo no meio)
+        """
+        with self._lock:
+            window = self._window(symbol, days, max_age)
+            return window.to_frame() if window is not None else None
+
+    def discard(self, symbol: str):
+        """Remove um símbolo do armazenamento"""
+        with self._lock:
+            self._rings.pop(symbol, None)
+
+    def to_dict(self) -> Dict:
+        """Resumo serializável"""
+        with self._lock:
+            return {
+                'symbols': len(self._rings),
+                'max_symbols': self.max_symbols,
+                'capacity': self.capacity,
+                'memory_bytes': sum(ring.nbytes() for ring in self._rings.values()),
+                'max_memory_bytes': self.max_symbols * 2 * self.capacity * BAR_BYTES,
+                'hits': self.hits,
+                'misses': self.misses,
+                'bars_appended': self.appended,
+                'reloads': self.reloaded
+            }
@@ -0,0 +1,113 @@
+"""
+Coalescência de requisições idênticas em andamento (single-flight)
+A primeira chamada para uma chave executa a busca; as que chegam enquanto ela
+está em andamento esperam e recebem o mesmo resultado (ou a mesma exceção)
+"""
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+class _Call:
+    """Busca em andamento compartilhada pelos chamadores de uma chave"""
+
+    __slots__ = ('done', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+class SingleFlight:
+    """Coalescência entre threads (gerenciador síncrono)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Executa fn uma única vez por chave entre as chamadas concorrentes
+
+        Returns:
+            Tupla (resultado, compartilhado): compartilhado é True para quem apenas
+            esperou a busca de outra thread
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.coalesced += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+        return call.result, False
+
+    def to_dict(self) -> Dict:
+        """Resumo serializável"""
+        with self._lock:
+            return {
+                'in_flight': len(self._calls),
+                'waiting': sum(call.waiters for call in self._calls.values()),
+                'coalesced': self.coalesced
+            }
+
+class AsyncSingleFlight:
+    """Coalescência entre tarefas do mesmo event loop (gerenciador assíncrono)"""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Equivalente assíncrono de SingleFlight.do"""
+        future = self._calls.get(key)
+        if future is not None:
+            self.coalesced += 1
+            # shield: cancelar quem espera não cancela a busca compartilhada
+            return await asyncio.shield(future), True
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # Evita o aviso de exceção não lida quando ninguém esperava
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            del self._calls[key]
+
+    def to_dict(self) -> Dict:
+        """Resumo serializável"""
+        return {
+            'in_flight': len(self._calls),
+            'coalesced': self.coalesced
+        }
@@ -0,0 +1,74 @@
+"""
+Último histórico real obtido por símbolo (stale-if-error)
+Quando todos os provedores externos falham, o gerenciador responde com o último
+histórico bom em vez de dados simulados, marcado como antigo em DataFrame.attrs.
+A memória guarda os símbolos mais recentes; o armazenamento local de preços
+(PriceStore), quando habilitado, é a camada em disco.
+"""
+
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Hashable, Optional, Dict, Tuple
+
+import pandas as pd
+
+# Chaves de DataFrame.attrs preenchidas em todo histórico devolvido pelo gerenciador
+ATTR_STALE = 'stale'
+ATTR_FETCHED_AT = 'fetched_at'  # ISO 8601 da obtenção no provedor
+ATTR_SOURCE = 'source'          # Provedor (ou armazenamento local) de origem
+ATTR_SYNTHETIC = 'synthetic'    # Histórico gerado a partir da cotação (só o último candle é real)
+
+def mark_history(data: pd.DataFrame, fetched_at: datetime, source: Optional[str], stale: bool) -> pd.DataFrame:
+    """Preenche os atributos de procedência do histórico (in-place) e o devolve"""
+    data.attrs[ATTR_STALE] = stale
+    data.attrs[ATTR_FETCHED_AT] = fetched_at.isoformat()
+    data.attrs[ATTR_SOURCE] = source
+    return data
+
+def history_age(data: Optional[pd.DataFrame]) -> Optional[float]:
+    """Idade dos dados em segundos a partir de attrs (None se desconhecida)"""
+    if data is None or ATTR_FETCHED_AT not in data.attrs:
+        return None
+    return max((datetime.now() - datetime.fromisoformat(data.attrs[ATTR_FETCHED_AT])).total_seconds(), 0.0)
+
+class LastGoodCache:
+    """Último histórico real por chave (ex: símbolo e dias) em memória, LRU limitado a max_entries"""
+
+    def __init__(self, max_entries: int = 500):
+        self._lock = threading.Lock()
+        self.max_entries = max(1, max_entries)
+        self.served = 0
+        self._entries: 'OrderedDict[Hashable, Tuple[pd.DataFrame, datetime, Optional[str]]]' = OrderedDict()
+
+    def set(self, key: Hashable, data: pd.DataFrame, source: Optional[str]):
+        """Guarda uma cópia do histórico obtido agora"""
+        entry = (data.copy(), datetime.now(), source)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, key: Hashable, max_age: float) -> Optional[Tuple[pd.DataFrame, datetime, Optional[str]]]:
+        """(cópia do histórico, obtido em, origem) se houver entrada com até max_age segundos"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (datetime.now() - entry[1]).total_seconds() > max_age:
+                return None
+            self._entries.move_to_end(key)
+        return entry[0].copy(), entry[1], entry[2]
+
+    def record_served(self):
+        """Conta uma resposta servida com dados antigos"""
+        with self._lock:
+            self.served += 1
+
+    def to_dict(self) -> Dict:
+        """Resumo serializável"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'served_stale': self.served
+            }
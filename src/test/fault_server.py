@@ -0,0 +1,337 @@
+"""
+Servidor local que emula BrAPI, HG Finance, MFinance e Tiingo com injeção de falhas
+
+Responde os endpoints chamados pelos provedores REST com OHLCV determinístico
+(backend.simulation) e injeta latência, timeouts, 429, rajadas de 5xx e JSON
+malformado. Aponte os provedores para ele pelas URLs base da configuração:
+
+    BRAPI_BASE_URL=http://127.0.0.1:8765/api
+    HG_FINANCE_BASE_URL=http://127.0.0.1:8765/finance
+    MFINANCE_BASE_URL=http://127.0.0.1:8765/api/v1
+    TIINGO_BASE_URL=http://127.0.0.1:8765/tiingo/daily
+
+Uso (a partir da raiz do repositório):
+    # Só o servidor
+    PYTHONPATH=src python src/test/fault_server.py --port 8765 --latency lognormal:80,0.5 --rate-429 0.05
+
+    # Servidor + ciclo da cadeia de fallback contra ele (sai com 1 se estourar --budget)
+    PYTHONPATH=src python src/test/fault_server.py --bench PETR4 VALE3 ITUB4 \\
+        --burst-every 20 --burst-length 5 --faults-for brapi,hg --budget 30
+
+Distribuições de latência (ms): fixed:50, uniform:20,200, normal:80,30, lognormal:80,0.5
+(mediana e sigma). GET /__stats devolve as contagens de respostas por provedor.
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+from backend.config import DataProviderConfig
+from backend.simulation import simulate_ohlcv
+
+# Pregões aproximados para os ranges da BrAPI
+RANGE_DAYS = {'1d': 1, '5d': 5, '1mo': 22, '3mo': 66, '6mo': 126, '1y': 252, '2y': 504, '5y': 1260}
+
+class FaultProfile:
+    """Falhas a injetar e sorteio por requisição"""
+
+    def __init__(self, latency='fixed:0', timeout_rate=0.0, timeout_seconds=30.0, rate_429=0.0,
+                 error_rate=0.0, burst_every=0.0, burst_length=0.0, malformed_rate=0.0,
+                 faults_for=None, missing=None, seed=None):
+        self.latency = self._parse_latency(latency)
+        self.timeout_rate = timeout_rate
+        self.timeout_seconds = timeout_seconds
+        self.rate_429 = rate_429
+        self.error_rate = error_rate
+        self.burst_every = burst_every
+        self.burst_length = burst_length
+        self.malformed_rate = malformed_rate
+        self.faults_for = set(faults_for or [])
+        self.missing = {symbol.upper() for symbol in (missing or [])}
+        self.started_at = time.monotonic()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _parse_latency(spec):
+        kind, _, args = spec.partition(':')
+        values = [float(value) for value in args.split(',') if value]
+        if kind not in ('fixed', 'uniform', 'normal', 'lognormal'):
+            raise ValueError(f"Distribuição de latência desconhecida: {spec}")
+        return kind, values
+
+    def delay(self):
+        """Latência sorteada em segundos"""
+        kind, values = self.latency
+        with self._lock:
+            if kind == 'fixed':
+                ms = values[0] if values else 0.0
+            elif kind == 'uniform':
+                ms = self._random.uniform(values[0], values[1])
+            elif kind == 'normal':
+                ms = self._random.gauss(values[0], values[1])
+            else:
+                ms = values[0] * self._random.lognormvariate(0, values[1])
+        return max(ms, 0.0) / 1000
+
+    def in_burst(self):
+        """Indica se estamos dentro de uma rajada de 5xx"""
+        if self.burst_every <= 0:
+            return False
+        return (time.monotonic() - self.started_at) % self.burst_every < self.burst_length
+
+    def pick_fault(self, provider):
+        """Falha para esta requisição: None, 'timeout', '429', '5xx' ou 'malformed'"""
+        if self.faults_for and provider not in self.faults_for:
+            return None
+        if self.in_burst():
+            return '5xx'
+
+        with self._lock:
+            roll = self._random.random()
+        for fault, rate in (('timeout', self.timeout_rate), ('429', self.rate_429),
+                            ('5xx', self.error_rate), ('malformed', self.malformed_rate)):
+            if roll < rate:
+                return fault
+            roll -= rate
+        return None
+
+def ohlcv_records(symbol, days, epoch_dates):
+    """Candles determinísticos do símbolo no formato das APIs"""
+    data = simulate_ohlcv(symbol, max(days, 1), 30.0, 0.02)
+    return [{
+        'date': int(date.timestamp()) if epoch_dates else date.strftime('%Y-%m-%dT00:00:00.000Z'),
+        'open': float(row.Open),
+        'high': float(row.High),
+        'low': float(row.Low),
+        'close': float(row.Close),
+        'volume': int(row.Volume)
+    } for date, row in zip(data.index, data.itertuples())]
+
+def last_bar(symbol):
+    return ohlcv_records(symbol, 1, True)[-1]
+
+def brapi_payload(symbols, query):
+    days = RANGE_DAYS.get(query.get('range', [''])[0], 0)
+    results = []
+    for symbol in symbols:
+        bar = last_bar(symbol)
+        result = {
+            'symbol': symbol,
+            'regularMarketPrice': bar['close'],
+            'regularMarketDayHigh': bar['high'],
+            'regularMarketDayLow': bar['low'],
+            'regularMarketPreviousClose': bar['open']
+        }
+        if days:
+            result['historicalDataPrice'] = ohlcv_records(symbol, days, True)
+        results.append(result)
+    return {'results': results}
+
+def hg_payload(symbol):
+    return {'results': {symbol: {'symbol': symbol, 'price': last_bar(symbol)['close']}}}
+
+def mfinance_payload(symbol):
+    bar = last_bar(symbol)
+    return {'symbol': symbol, 'lastPrice': bar['close'], 'high': bar['high'],
+            'low': bar['low'], 'priceOpen': bar['open']}
+
+def tiingo_payload(symbol, query):
+    start = query.get('startDate', [None])[0]
+    days = 30
+    if start:
+        days = max(1, int((datetime.now() - datetime.strptime(start, '%Y-%m-%d')).days * 5 / 7))
+    return ohlcv_records(symbol, days, False)
+
+def route(path, query):
+    """(provedor, símbolos, função que monta o payload) para o caminho pedido"""
+    match = re.fullmatch(r'/api/quote/([^/]+)(/history)?', path)
+    if match:
+        symbols = [symbol.upper() for symbol in match.group(1).split(',')]
+        return 'brapi', symbols, lambda: brapi_payload(symbols, query if not match.group(2) else {'range': ['1mo']})
+
+    match = re.fullmatch(r'/api/v1/stocks/(?:historicals/)?([^/]+)', path)
+    if match:
+        symbol = match.group(1).upper()
+        if '/historicals/' in path:
+            return 'mfinance', [symbol], lambda: {'symbol': symbol, 'historicals': ohlcv_records(symbol, 30, False)}
+        return 'mfinance', [symbol], lambda: mfinance_payload(symbol)
+
+    match = re.fullmatch(r'/finance/(?:stock_price|quotations)(?:/stocks/([^/]+))?', path)
+    if match:
+        symbol = (match.group(1) or query.get('symbol', [''])[0]).upper()
+        return 'hg', [symbol], lambda: hg_payload(symbol)
+
+    match = re.fullmatch(r'/tiingo/daily/([^/]+)/prices', path)
+    if match:
+        symbol = match.group(1).upper()
+        return 'tiingo', [symbol.replace('.SA', '')], lambda: tiingo_payload(symbol, query)
+
+    return None, [], None
+
+def create_handler(profile, stats):
+    class FaultHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # keep-alive, como as APIs reais
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, body, content_type='application/json'):
+            payload = body.encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            parts = urlsplit(self.path)
+            query = parse_qs(parts.query)
+
+            if parts.path == '/__stats':
+                with stats['lock']:
+                    self._send(200, json.dumps({key: dict(counter) for key, counter in stats['counts'].items()}))
+                return
+
+            provider, symbols, build = route(parts.path, query)
+            time.sleep(profile.delay())
+
+            if provider is None:
+                outcome = 'unknown_path'
+                self._send(404, json.dumps({'error': True, 'message': 'Not found'}))
+            else:
+                fault = profile.pick_fault(provider)
+                outcome = fault or 'ok'
+                if fault == 'timeout':
+                    time.sleep(profile.timeout_seconds)
+                    self._send(504, json.dumps({'error': True, 'message': 'Gateway timeout'}))
+                elif fault == '429':
+                    self._send(429, json.dumps({'error': True, 'message': 'Too many requests'}))
+                elif fault == '5xx':
+                    self._send(random.choice([500, 502, 503]), '<html>upstream error</html>', 'text/html')
+                elif fault == 'malformed':
+                    self._send(200, json.dumps(build())[:-7])
+                elif all(symbol in profile.missing for symbol in symbols):
+                    outcome = 'not_found'
+                    self._send(404, json.dumps({'error': True, 'message': 'Symbol not found'}))
+                else:
+                    self._send(200, json.dumps(build()))
+
+            with stats['lock']:
+                stats['counts'].setdefault(provider or 'unknown', Counter())[outcome] += 1
+
+    return FaultHandler
+
+def start_server(profile, host='127.0.0.1', port=0):
+    """Sobe o servidor em uma thread e retorna (servidor, estatísticas)"""
+    stats = {'lock': threading.Lock(), 'counts': {}}
+    server = ThreadingHTTPServer((host, port), create_handler(profile, stats))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, stats
+
+def point_providers_at(base):
+    """Aponta as URLs base dos provedores REST para o servidor (antes de criá-los)"""
+    urls = {
+        'BRAPI_BASE_URL': f"{base}/api",
+        'HG_FINANCE_BASE_URL': f"{base}/finance",
+        'MFINANCE_BASE_URL': f"{base}/api/v1",
+        'TIINGO_BASE_URL': f"{base}/tiingo/daily"
+    }
+    for name, url in urls.items():
+        os.environ[name] = url
+        setattr(DataProviderConfig, name, url)  # backend.config já foi importado
+
+def run_bench(symbols, stats, budget):
+    """Roda a cadeia de fallback (só REST + simulado) contra o servidor e mede o ciclo"""
+    import logging
+    logging.disable(logging.WARNING)
+
+    from backend.data_providers import DataProviderManager, LazyProvider, RestDataProvider, PROVIDER_FACTORIES
+
+    providers = [
+        LazyProvider(name, factory) for name, factory in PROVIDER_FACTORIES
+        if issubclass(factory, RestDataProvider) or getattr(factory, 'simulated', False)
+    ]
+    manager = DataProviderManager(price_store=None, providers=providers, quota_planner=None)
+
+    start = time.perf_counter()
+    for symbol in symbols:
+        symbol_start = time.perf_counter()
+        data, provider = manager._fetch_from_providers(symbol, 30)
+        source = provider.get_provider_name() if provider is not None else '-'
+        print(f"  {symbol:<8} {source:<16} {(time.perf_counter() - symbol_start) * 1000:>9.1f}ms")
+    elapsed = time.perf_counter() - start
+
+    print(f"\nCiclo: {elapsed:.2f}s para {len(symbols)} símbolos")
+    print("\nRespostas do servidor:")
+    with stats['lock']:
+        for provider, counter in sorted(stats['counts'].items()):
+            print(f"  {provider:<10} {dict(counter)}")
+
+    print("\nProvedores:")
+    for name, provider_stats in manager.get_provider_statistics().items():
+        breaker = provider_stats['circuit_breaker']
+        success_rate = provider_stats['success_rate']
+        success = f"{success_rate * 100:>5.1f}%" if success_rate is not None else '    -'
+        print(f"  {name:<16} sucesso {success}  "
+              f"circuito {breaker['state'] if breaker else '-'}")
+
+    if budget and elapsed > budget:
+        print(f"\n⚠️ Ciclo acima do orçamento de {budget:.1f}s")
+        sys.exit(1)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', default='fixed:0', help='distribuição de latência em ms')
+    parser.add_argument('--timeout-rate', type=float, default=0.0, help='fração de requisições que travam')
+    parser.add_argument('--timeout-seconds', type=float, default=30.0, help='tempo travado antes de responder 504')
+    parser.add_argument('--rate-429', type=float, default=0.0, help='fração de respostas 429')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fração de respostas 5xx avulsas')
+    parser.add_argument('--burst-every', type=float, default=0.0, help='período das rajadas de 5xx (s)')
+    parser.add_argument('--burst-length', type=float, default=0.0, help='duração de cada rajada (s)')
+    parser.add_argument('--malformed-rate', type=float, default=0.0, help='fração de JSON truncado')
+    parser.add_argument('--faults-for', default='', help='provedores com falhas (brapi,hg,mfinance,tiingo)')
+    parser.add_argument('--missing', default='', help='símbolos que respondem 404')
+    parser.add_argument('--seed', type=int, default=None, help='semente do sorteio de falhas')
+    parser.add_argument('--bench', nargs='+', metavar='SÍMBOLO', help='roda a cadeia de fallback contra o servidor')
+    parser.add_argument('--budget', type=float, default=0.0, help='tempo máximo do ciclo no --bench (s)')
+    args = parser.parse_args()
+
+    profile = FaultProfile(
+        latency=args.latency, timeout_rate=args.timeout_rate, timeout_seconds=args.timeout_seconds,
+        rate_429=args.rate_429, error_rate=args.error_rate, burst_every=args.burst_every,
+        burst_length=args.burst_length, malformed_rate=args.malformed_rate,
+        faults_for=[name for name in args.faults_for.split(',') if name],
+        missing=[symbol for symbol in args.missing.split(',') if symbol], seed=args.seed
+    )
+
+    server, stats = start_server(profile, args.host, 0 if args.bench else args.port)
+    base = f"http://{server.server_address[0]}:{server.server_address[1]}"
+
+    if args.bench:
+        point_providers_at(base)
+        run_bench(args.bench, stats, args.budget)
+        server.shutdown()
+        return
+
+    print(f"Servidor de falhas em {base} (Ctrl+C para sair)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Relatório de tempo de importação dos módulos do backend
+
+Cada módulo é importado em um processo Python novo com -X importtime, medindo o
+custo real de cold start (como na subida de um container ou em um --reload do
+uvicorn). Também mede a criação do DataProviderManager e a primeira construção de
+cada provedor.
+
+Uso (a partir da raiz do repositório):
+    PYTHONPATH=src python src/test/import_time_report.py [modulo ...]
+
+Orçamento por módulo em milissegundos via IMPORT_BUDGET_MS (padrão 1500);
+o script termina com código 1 se algum módulo estourar o orçamento.
+"""
+
+import os
+import subprocess
+import sys
+
+DEFAULT_MODULES = [
+    'backend.config',
+    'backend.database',
+    'backend.data_providers',
+    'backend.analyzer',
+]
+
+BUDGET_MS = float(os.environ.get('IMPORT_BUDGET_MS', '1500'))
+TOP_PACKAGES = 8
+
+def measure_import(module):
+    """Retorna (tempo total em ms, [(ms, pacote)] dos mais caros) ou (None, erro)"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True, text=True, env=os.environ.copy()
+    )
+    if result.returncode != 0:
+        return None, result.stderr.strip().splitlines()[-1]
+
+    # A saída é pós-ordem: os filhos diretos (indentação de 3 espaços) aparecem
+    # antes da linha do próprio módulo (indentação de 1 espaço)
+    total = 0.0
+    children = []
+    for line in result.stderr.splitlines():
+        # Formato: "import time:   self [us] | cumulative | imported package"
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, package = line[len('import time:'):].split('|')
+        ms = int(cumulative) / 1000
+        depth = (len(package) - len(package.lstrip(' ')) - 1) // 2
+
+        if depth == 1:
+            children.append((ms, package.strip()))
+        elif depth == 0:
+            if package.strip() == module:
+                total = ms
+                break
+            children = []
+
+    return total, sorted(children, reverse=True)[:TOP_PACKAGES]
+
+def measure_providers():
+    """Mede a criação do gerenciador e a construção de cada provedor em um processo novo"""
+    script = """
+import time, logging
+logging.disable(logging.CRITICAL)
+start = time.perf_counter()
+from backend.data_providers import DataProviderManager
+manager = DataProviderManager(price_store=None, quota_planner=None)
+print(f"DataProviderManager()|{(time.perf_counter() - start) * 1000:.1f}")
+for provider in manager.providers:
+    start = time.perf_counter()
+    getattr(provider, 'provider', provider)
+    print(f"{provider.get_provider_name()}|{(time.perf_counter() - start) * 1000:.1f}")
+"""
+    result = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, env=os.environ.copy())
+    if result.returncode != 0:
+        print(f"  Falha ao medir provedores: {result.stderr.strip().splitlines()[-1]}")
+        return
+
+    for line in result.stdout.splitlines():
+        name, ms = line.split('|')
+        print(f"  {name:<24} {float(ms):>9.1f} ms")
+
+def main():
+    modules = sys.argv[1:] or DEFAULT_MODULES
+    over_budget = []
+
+    print(f"Tempo de importação (orçamento: {BUDGET_MS:.0f} ms por módulo)\n")
+
+    for module in modules:
+        total, detail = measure_import(module)
+        if total is None:
+            print(f"❌ {module}: erro na importação ({detail})\n")
+            over_budget.append(module)
+            continue
+
+        status = '✅' if total <= BUDGET_MS else '⚠️'
+        print(f"{status} {module}: {total:.1f} ms")
+        for ms, package in detail:
+            print(f"     {ms:>9.1f} ms  {package}")
+        print()
+
+        if total > BUDGET_MS:
+            over_budget.append(module)
+
+    print("Construção sob demanda dos provedores (primeiro uso):")
+    measure_providers()
+
+    if over_budget:
+        print(f"\nAcima do orçamento: {', '.join(over_budget)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
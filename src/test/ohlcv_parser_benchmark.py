@@ -0,0 +1,114 @@
+"""
+Benchmark da conversão JSON -> OHLCV dos provedores REST
+
+Compara a conversão antiga (um dicionário por candle) com records_to_ohlcv para
+payloads de 30 barras e de vários anos, no formato da BrAPI (data em epoch) e da
+Tiingo (data ISO), e mede a geração sintética usada por HG Finance/MFinance.
+A coluna "colunar" força o caminho from_records mesmo em payloads pequenos, para
+conferir o limite SMALL_PAYLOAD_BARS.
+
+Uso (a partir da raiz do repositório):
+    PYTHONPATH=src python src/test/ohlcv_parser_benchmark.py [repetições]
+"""
+
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from backend import ohlcv_parser
+from backend.ohlcv_parser import records_to_ohlcv, recent_business_days, synthetic_history
+
+SIZES = [('30 barras', 30), ('3 meses', 63), ('6 meses', 126), ('1 ano', 252), ('5 anos', 1260), ('20 anos', 5040)]
+
+def make_payload(bars, epoch_dates):
+    """Candles no formato das APIs (BrAPI usa epoch em segundos, Tiingo usa ISO)"""
+    rng = np.random.default_rng(42)
+    close = 30 * np.cumprod(1 + rng.normal(0, 0.02, bars))
+    dates = pd.bdate_range(end=datetime(2024, 12, 31), periods=bars)
+    records = []
+    for date, price in zip(dates, close):
+        records.append({
+            'date': int(date.timestamp()) if epoch_dates else date.strftime('%Y-%m-%dT00:00:00.000Z'),
+            'open': round(price * 0.99, 2),
+            'high': round(price * 1.01, 2),
+            'low': round(price * 0.98, 2),
+            'close': round(price, 2),
+            'volume': int(rng.integers(100000, 5000000))
+        })
+    return records
+
+def legacy_parse(records):
+    """Conversão item a item como era feita nos provedores"""
+    df_data = []
+    for item in records:
+        try:
+            date = item.get('date')
+            df_data.append({
+                'Open': float(item.get('open', 0)),
+                'High': float(item.get('high', 0)),
+                'Low': float(item.get('low', 0)),
+                'Close': float(item.get('close', 0)),
+                'Volume': int(item.get('volume', 0)),
+                'Date': pd.to_datetime(date, unit='s') if isinstance(date, (int, float)) else pd.to_datetime(date)
+            })
+        except (ValueError, TypeError):
+            continue
+
+    data = pd.DataFrame(df_data)
+    data.set_index('Date', inplace=True)
+    data = data.sort_index()
+    return data[(data['Close'] > 0) & (data['Open'] > 0)]
+
+def columnar_parse(records):
+    """records_to_ohlcv sem o atalho para payloads pequenos"""
+    threshold = ohlcv_parser.SMALL_PAYLOAD_BARS
+    ohlcv_parser.SMALL_PAYLOAD_BARS = 0
+    try:
+        return records_to_ohlcv(records)
+    finally:
+        ohlcv_parser.SMALL_PAYLOAD_BARS = threshold
+
+def timed(func, repeat):
+    """Melhor tempo em milissegundos entre as repetições"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    print(f"Conversão JSON -> OHLCV (melhor de {repeat})\n")
+    print(f"{'payload':<22} {'legado':>10} {'colunar':>10} {'atual':>10} {'ganho':>8}")
+
+    for epoch_dates, label in [(True, 'BrAPI'), (False, 'Tiingo')]:
+        for size_label, bars in SIZES:
+            records = make_payload(bars, epoch_dates)
+
+            # Todos os caminhos precisam produzir o mesmo OHLC
+            legacy = legacy_parse(records)
+            current = records_to_ohlcv(records)
+            pd.testing.assert_frame_equal(current, columnar_parse(records))
+            assert np.allclose(legacy[['Open', 'High', 'Low', 'Close']].values,
+                               current[['Open', 'High', 'Low', 'Close']].values)
+
+            legacy_ms = timed(lambda: legacy_parse(records), repeat)
+            columnar_ms = timed(lambda: columnar_parse(records), repeat)
+            current_ms = timed(lambda: records_to_ohlcv(records), repeat)
+            print(f"{label + ' ' + size_label:<22} {legacy_ms:>8.2f}ms {columnar_ms:>8.2f}ms "
+                  f"{current_ms:>8.2f}ms {legacy_ms / current_ms:>7.1f}x")
+
+    print("\nHistórico sintético a partir do preço atual (HG Finance/MFinance)\n")
+    for size_label, bars in SIZES:
+        dates = recent_business_days(bars)
+        elapsed = timed(lambda: synthetic_history(30.0, dates, 0.02, (1.0, 1.015), (0.985, 1.0),
+                                                  (500000, 5000000)), repeat)
+        print(f"{size_label:<22} {elapsed:>8.2f}ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Benchmark offline da cadeia de provedores REST usando cassetes HTTP
+
+1. Grave uma vez com rede (respostas reais vão para HTTP_CASSETTE_DIR):
+    HTTP_CASSETTE_MODE=record PYTHONPATH=src python src/test/provider_replay_benchmark.py PETR4 VALE3
+2. Reproduza quantas vezes quiser, sem rede e com latência artificial opcional:
+    HTTP_CASSETTE_LATENCY=0.08 HTTP_CASSETTE_JITTER=0.04 \\
+        PYTHONPATH=src python src/test/provider_replay_benchmark.py PETR4 VALE3
+
+Só os provedores REST (e o simulado, como último recurso) participam: os
+provedores de SDK não passam pela sessão HTTP compartilhada. O modo padrão
+deste script é replay.
+"""
+
+import os
+import sys
+import time
+import logging
+
+os.environ.setdefault('HTTP_CASSETTE_MODE', 'replay')
+
+from backend import analyzer
+from backend.cassette import get_cassette_store, cassette_mode, MODE_REPLAY
+from backend.data_providers import DataProviderManager, LazyProvider, RestDataProvider, PROVIDER_FACTORIES
+
+DEFAULT_SYMBOLS = ['PETR4', 'VALE3', 'ITUB4', 'BBDC4', 'WEGE3']
+
+def create_manager():
+    """Gerenciador só com provedores REST e simulado, sem histórico local"""
+    providers = [
+        LazyProvider(name, factory) for name, factory in PROVIDER_FACTORIES
+        if issubclass(factory, RestDataProvider) or getattr(factory, 'simulated', False)
+    ]
+    manager = DataProviderManager(price_store=None, providers=providers)
+    if cassette_mode() == MODE_REPLAY:
+        manager.quota_planner = None  # Reprodução não consome cota real
+    return manager
+
+def main():
+    symbols = sys.argv[1:] or DEFAULT_SYMBOLS
+    logging.disable(logging.WARNING)
+    store = get_cassette_store()
+
+    print(f"Cassetes em modo {cassette_mode()} ({store.directory}), "
+          f"latência {store.latency * 1000:.0f}ms ± {store.jitter * 1000:.0f}ms\n")
+
+    manager = create_manager()
+    start = time.perf_counter()
+    for symbol in symbols:
+        symbol_start = time.perf_counter()
+        data, provider = manager._fetch_from_providers(symbol, 30)
+        source = provider.get_provider_name() if provider is not None else '-'
+        records = len(data) if data is not None else 0
+        print(f"  {symbol:<8} {source:<16} {records:>4} registros {(time.perf_counter() - symbol_start) * 1000:>9.1f}ms")
+    chain_elapsed = time.perf_counter() - start
+
+    # Ciclo de análise completo sobre os mesmos payloads
+    analyzer.data_manager = create_manager()
+    start = time.perf_counter()
+    for symbol in symbols:
+        analyzer.analyze_stock(symbol)
+    analysis_elapsed = time.perf_counter() - start
+
+    print(f"\nCadeia de fallback: {chain_elapsed:.2f}s para {len(symbols)} símbolos")
+    print(f"Ciclo de análise:   {analysis_elapsed:.2f}s para {len(symbols)} símbolos")
+    print(f"Cassetes: {store.to_dict()}")
+
+if __name__ == "__main__":
+    main()